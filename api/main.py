@@ -1,7 +1,8 @@
-"""FastAPI app: single endpoint for question + scenario -> template extract, validation, audit log."""
+"""FastAPI app: question + scenario -> template extract, validation, audit log (sync or as a queued job)."""
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 
@@ -9,8 +10,25 @@ import sys
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from service.pipeline import run_pipeline
+from audit.store import get_audit_store
+from jobs.store import get_job_queue
+from jobs.worker import WorkerPool
+from config import JOBS_WORKERS
 
-app = FastAPI(title="PRA COREP Reporting Assistant", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    pool = None
+    # api.serve sets start_job_workers only in its first worker, so there is one pool per server
+    if JOBS_WORKERS > 0 and getattr(app.state, "start_job_workers", True):
+        pool = WorkerPool(JOBS_WORKERS)
+        pool.start()
+    yield
+    if pool is not None:
+        pool.stop()
+
+
+app = FastAPI(title="PRA COREP Reporting Assistant", version="0.1.0", lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 
@@ -20,6 +38,16 @@ class RequestBody(BaseModel):
     template_id: str = Field(default="C 01.00", description="Template to populate (e.g. C 01.00)")
 
 
+class JobTask(RequestBody):
+    entity_id: str = Field(default="", description="Reporting entity (e.g. LEI), carried into the result")
+
+
+class JobBody(BaseModel):
+    tasks: list[JobTask] = Field(..., min_length=1, description="Population runs to execute")
+    priority: int = Field(default=0, description="Higher runs first")
+    idempotency_key: str | None = Field(default=None, description="Re-submitting the same key returns the existing job")
+
+
 @app.post("/api/assist")
 def assist(body: RequestBody) -> dict:
     """Run RAG + LLM + validation + audit and return template extract, validation, and audit log."""
@@ -33,6 +61,56 @@ def assist(body: RequestBody) -> dict:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/jobs", status_code=202)
+def create_job(body: JobBody, idempotency_key: str | None = Header(default=None)) -> dict:
+    """Queue population runs for the background workers; returns immediately with the job id."""
+    job, created = get_job_queue().enqueue(
+        [t.model_dump() for t in body.tasks],
+        priority=body.priority,
+        idempotency_key=body.idempotency_key or idempotency_key,
+    )
+    return {**job, "created": created}
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str, include_results: bool = True) -> dict:
+    """Job status, progress and the results of tasks completed so far."""
+    job = get_job_queue().get(job_id, include_results=include_results)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job_id: {job_id}")
+    return job
+
+
+@app.get("/api/audit/runs")
+def audit_runs(
+    chunk_id: str | None = None,
+    field_id: str | None = None,
+    template_id: str | None = None,
+    date_from: str | None = Query(default=None, description="Reference date from (YYYY-MM-DD, inclusive)"),
+    date_to: str | None = Query(default=None, description="Reference date to (YYYY-MM-DD, inclusive)"),
+    limit: int = Query(default=100, ge=1, le=10000),
+) -> dict:
+    """Persisted runs matching all filters, e.g. runs citing a chunk_id within a reference-date range."""
+    runs = get_audit_store().find_runs(
+        chunk_id=chunk_id,
+        field_id=field_id,
+        template_id=template_id,
+        date_from=date_from,
+        date_to=date_to,
+        limit=limit,
+    )
+    return {"runs": runs}
+
+
+@app.get("/api/audit/runs/{run_id}")
+def audit_run(run_id: str) -> dict:
+    """Full persisted audit record (fields, values, cited chunk_ids) for one run."""
+    run = get_audit_store().get_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run_id: {run_id}")
+    return run
+
+
 @app.get("/health")
 def health() -> dict:
     return {"status": "ok"}
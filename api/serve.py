@@ -0,0 +1,176 @@
+"""
+Multi-worker API server that loads the retriever once and shares it with forked workers.
+
+`uvicorn --workers N` starts N fresh interpreters, each loading its own embedding model, BM25 index
+and chunks. Here the parent loads everything once (with DENSE_INDEX=mmap, dense vectors are
+memory-mapped from embeddings.npy), freezes the heap so the garbage collector does not dirty shared
+pages, and forks N workers that serve the same listening socket. With EMBEDDING_WORKER=1 the model lives only in one embedding
+process that micro-batches queries from all workers.
+
+Usage:
+    python -m api.serve --workers 4 --port 8000 [--embedding-worker] [--dense-index mmap]
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import (
+    SERVE_HOST,
+    SERVE_PORT,
+    SERVE_WORKERS,
+    EMBEDDING_WORKER,
+    DENSE_INDEX,
+)
+
+# An embedding process that dies sooner than this after (re)starting is not restarted again
+EMBEDDING_WORKER_MIN_UPTIME_S = 10.0
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(idx: int, sock: socket.socket, app, log_level: str) -> None:
+    import uvicorn
+
+    gc.enable()
+    # One job worker pool (JOBS_WORKERS) per server, not one per API worker
+    app.state.start_job_workers = idx == 0
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # The shared encoder (if any) opens this worker's own connection on first use
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def serve(
+    workers: int = SERVE_WORKERS,
+    host: str = SERVE_HOST,
+    port: int = SERVE_PORT,
+    use_embedding_worker: bool = EMBEDDING_WORKER,
+    dense_index: str = DENSE_INDEX,
+    log_level: str = "info",
+) -> None:
+    """Load the index once, fork `workers` API processes on one socket and supervise them."""
+    # Avoid collections while the shared structures are built; they are frozen before forking
+    gc.disable()
+
+    embedding_worker = None
+    if use_embedding_worker:
+        from rag.embed_worker import EmbeddingWorker
+        # Started before anything imports torch in this process
+        embedding_worker = EmbeddingWorker()
+        embedding_worker.start()
+    embedding_started = time.monotonic()
+
+    from rag.retriever import load_query_encoder, load_retriever
+    from rag.snapshots import SnapshotRouter, SnapshotStore
+    from service.pipeline import set_retriever, set_router
+    from api.main import app
+
+    embedding_model = embedding_worker.client() if embedding_worker else load_query_encoder()
+    if SnapshotStore().registry_path.exists():
+        # Requests are routed to snapshots: preload the current one so workers share it (older ones
+        # load on demand per worker); the legacy index is not loaded at all
+        router = SnapshotRouter(embedding_model=embedding_model)
+        router.retriever_for()
+        set_router(router)
+    else:
+        set_retriever(load_retriever(embedding_model=embedding_model, dense_index=dense_index))
+
+    sock = _bind(host, port)
+    gc.freeze()
+
+    children: dict[int, int] = {}
+    stopping = False
+
+    def spawn(idx: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(idx, sock, app, log_level)
+            finally:
+                # os._exit skips atexit: persist queued audit runs and seal the active segment first
+                from audit.store import close_audit_store
+                close_audit_store()
+                os._exit(0)
+        children[pid] = idx
+
+    def shutdown(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    for idx in range(workers):
+        spawn(idx)
+    print(f"Serving on http://{host}:{port} with {workers} workers (dense index: {dense_index}, "
+          f"embedding worker: {'on' if embedding_worker else 'off'})")
+
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if embedding_worker is not None and pid == embedding_worker.pid:
+            # The embedding process is a child too: without it every query encode fails
+            embedding_worker.collected()
+            if stopping:
+                continue
+            if time.monotonic() - embedding_started < EMBEDDING_WORKER_MIN_UPTIME_S:
+                print("Embedding worker keeps exiting; stopping the server")
+                shutdown(signal.SIGTERM, None)
+                continue
+            print("Embedding worker exited; restarting it")
+            try:
+                embedding_worker.start()
+            except RuntimeError as e:
+                print(f"{e}; stopping the server")
+                shutdown(signal.SIGTERM, None)
+            embedding_started = time.monotonic()
+            continue
+        idx = children.pop(pid, None)
+        if idx is not None and not stopping:
+            # Worker died unexpectedly: replace it (it re-inherits the shared, frozen heap)
+            spawn(idx)
+
+    sock.close()
+    if embedding_worker is not None:
+        embedding_worker.stop()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the API from forked workers sharing one loaded index.")
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--host", default=SERVE_HOST)
+    parser.add_argument("--port", type=int, default=SERVE_PORT)
+    parser.add_argument("--embedding-worker", action="store_true", default=EMBEDDING_WORKER,
+                        help="Encode queries in one shared embedding process")
+    parser.add_argument("--dense-index", choices=["mmap", "chroma"], default=DENSE_INDEX,
+                        help="mmap shares embeddings.npy pages between workers (default: DENSE_INDEX)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    serve(args.workers, args.host, args.port, args.embedding_worker, args.dense_index, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,130 @@ sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 import streamlit as st
 
-from service.pipeline import run_pipeline
+from service import RunCache, get_retriever
+from schemas.corep_ca1 import OwnFundsSchema
+from export import ExportItem, ReportPackageWriter, write_tsv
+
+# Results kept per session for instant re-display on reruns (older ones are dropped)
+SESSION_RESULTS = 20
+
+_TABLE_CSS = """
+<style>
+.corep-extract { font-family: sans-serif; margin: 1em 0; }
+.corep-table { border-collapse: collapse; width: 100%; max-width: 600px; }
+.corep-table th, .corep-table td { border: 1px solid #ddd; padding: 8px 12px; text-align: left; }
+.corep-table th { background: #f5f5f5; }
+</style>
+"""
+
+
+@st.cache_resource(show_spinner="Loading regulatory index...")
+def _run_cache() -> RunCache:
+    """One warm pipeline per server process: index and encoder are loaded once, runs shared by all sessions."""
+    get_retriever()
+    return RunCache()
+
+
+def _export_item(schema_json: str, entity_id: str, template_id: str) -> ExportItem:
+    schema = OwnFundsSchema.model_validate_json(schema_json)
+    return ExportItem(
+        entity_id=entity_id, reference_date=schema.reference_date or "", schema=schema, template_id=template_id
+    )
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _export_tsv(schema_json: str, entity_id: str, template_id: str) -> bytes:
+    """TSV template extract for one result."""
+    tsv = io.StringIO()
+    write_tsv([_export_item(schema_json, entity_id, template_id)], tsv, include_entity=False)
+    return tsv.getvalue().encode("utf-8")
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _export_package(schema_json: str, entity_id: str, template_id: str) -> bytes:
+    """XBRL-CSV report package for one result; raises ValueError if it cannot be a valid filing."""
+    item = _export_item(schema_json, entity_id, template_id)
+    package = io.BytesIO()
+    with ReportPackageWriter(package, item.entity_id, item.reference_date) as writer:
+        writer.add(item.schema, item.template_id)
+    return package.getvalue()
+
+
+def render_retrieval(partial: dict) -> None:
+    chunks = partial.get("retrieved_chunks") or []
+    label = f"Retrieved rule paragraphs ({len(chunks)})"
+    if partial.get("snapshot_id"):
+        label += f" – index snapshot {partial['snapshot_id']}"
+    with st.expander(label):
+        for c in chunks:
+            st.markdown(f"**{c.get('chunk_id')}** — {c.get('source_ref', '')}")
+
+
+def render_template(partial: dict) -> None:
+    st.subheader("Answer summary")
+    st.write(partial.get("answer_summary") or "—")
+
+    st.subheader("Template extract (C 01.00 Own Funds)")
+    if partial.get("template_extract_html"):
+        st.markdown(_TABLE_CSS + partial["template_extract_html"], unsafe_allow_html=True)
+    else:
+        st.info("No template output.")
+
+    val = partial.get("validation", {})
+    st.subheader("Validation")
+    if val.get("valid"):
+        st.success("Validation passed.")
+    else:
+        for e in val.get("errors", []):
+            st.error(f"**{e.get('field_id', '')}**: {e.get('message', '')}")
+    for w in val.get("warnings", []):
+        st.warning(f"**{w.get('field_id', '')}**: {w.get('message', '')}")
+
+
+def render_audit(partial: dict) -> None:
+    st.subheader("Audit log (rule paragraphs per field)")
+    for entry in partial.get("audit_log", {}).get("entries", []):
+        with st.expander(f"{entry.get('field_label', entry.get('field_id'))} = {entry.get('value') or '—'}"):
+            for c in entry.get("citations", []):
+                st.markdown(f"**{c.get('paragraph_id')}** — {c.get('source_ref')}")
+                st.caption(c.get("excerpt", ""))
+                if c.get("source_url"):
+                    st.markdown(f"[Source]({c.get('source_url')})")
+
+
+def render_export(result: dict, entity_id: str, template_id: str) -> None:
+    st.subheader("Export result")
+    schema = result.get("schema")
+    if not schema:
+        return
+    st.download_button(
+        label="Download result (JSON)",
+        data=json.dumps(schema, indent=2).encode("utf-8"),
+        file_name="corep_c01_result.json",
+        mime="application/json",
+    )
+    schema_json = json.dumps(schema)
+    entity_id = entity_id.strip() or "ENTITY"
+    st.download_button(
+        label="Download template extract (TSV)",
+        data=_export_tsv(schema_json, entity_id, template_id),
+        file_name="corep_c01_extract.tsv",
+        mime="text/tab-separated-values",
+    )
+    try:
+        package_bytes = _export_package(schema_json, entity_id, template_id)
+    except ValueError as e:
+        st.warning(f"XBRL-CSV report package not available: {e}")
+        return
+    st.download_button(
+        label="Download XBRL-CSV report package (ZIP)",
+        data=package_bytes,
+        file_name="corep_c01_xbrl_csv.zip",
+        mime="application/zip",
+    )
+
+
+RENDERERS = {"retrieval": render_retrieval, "template": render_template, "audit": render_audit}
 
 st.set_page_config(page_title="PRA COREP Reporting Assistant", layout="wide")
 st.title("PRA COREP Reporting Assistant")
@@ -24,87 +147,47 @@ scenario = st.text_area("Reporting scenario", placeholder="e.g. Quarterly COREP
 template_id = st.selectbox("Template", ["C 01.00", "CA1"], format_func=lambda x: "C 01.00 – Own Funds" if x in ("C 01.00", "CA1") else x)
 if template_id == "CA1":
     template_id = "C 01.00"
+entity_id = st.text_input("Entity identifier (LEI, for XBRL-CSV export)", value="", placeholder="e.g. 5493001KJTIIGC8Y1R12")
+
+results: dict = st.session_state.setdefault("results", {})
 
 if st.button("Run assistant"):
     if not question.strip():
         st.warning("Please enter a question.")
     else:
-        with st.spinner("Retrieving rules and generating template..."):
-            try:
-                result = run_pipeline(question=question.strip(), scenario=scenario.strip(), template_id=template_id)
-            except FileNotFoundError as e:
-                st.error(f"Service not ready: run ingestion first. {e}")
-                st.stop()
-            except ValueError as e:
-                st.error(str(e))
-                st.stop()
-            except Exception as e:
-                st.error(str(e))
-                raise
-
-        st.subheader("Answer summary")
-        st.write(result.get("answer_summary") or "—")
-
-        st.subheader("Template extract (C 01.00 Own Funds)")
-        if result.get("template_extract_html"):
-            st.markdown(
-                """
-                <style>
-                .corep-extract { font-family: sans-serif; margin: 1em 0; }
-                .corep-table { border-collapse: collapse; width: 100%; max-width: 600px; }
-                .corep-table th, .corep-table td { border: 1px solid #ddd; padding: 8px 12px; text-align: left; }
-                .corep-table th { background: #f5f5f5; }
-                </style>
-                """ + result["template_extract_html"],
-                unsafe_allow_html=True,
-            )
-        else:
-            st.info("No template output.")
+        st.session_state["current"] = (question.strip(), scenario.strip(), template_id)
 
-        val = result.get("validation", {})
-        st.subheader("Validation")
-        if val.get("valid"):
-            st.success("Validation passed.")
+# Later widget interactions rerun the script: the current result is redrawn from session state.
+# A run still in flight (e.g. interrupted by a rerun) is re-attached, never started twice.
+# Keys include the index version, so a newly published snapshot or re-ingested index re-runs the question.
+current = st.session_state.get("current")
+if current is not None:
+    try:
+        key = _run_cache().key(*current)
+        if key in results:
+            result = results[key]
+            for render in RENDERERS.values():
+                render(result)
         else:
-            for e in val.get("errors", []):
-                st.error(f"**{e.get('field_id', '')}**: {e.get('message', '')}")
-        for w in val.get("warnings", []):
-            st.warning(f"**{w.get('field_id', '')}**: {w.get('message', '')}")
-
-        st.subheader("Audit log (rule paragraphs per field)")
-        for entry in result.get("audit_log", {}).get("entries", []):
-            with st.expander(f"{entry.get('field_label', entry.get('field_id'))} = {entry.get('value') or '—'}"):
-                for c in entry.get("citations", []):
-                    st.markdown(f"**{c.get('paragraph_id')}** — {c.get('source_ref')}")
-                    st.caption(c.get("excerpt", ""))
-                    if c.get("source_url"):
-                        st.markdown(f"[Source]({c.get('source_url')})")
-
-        st.subheader("Export result")
-        schema = result.get("schema")
-        if schema:
-            json_bytes = json.dumps(schema, indent=2).encode("utf-8")
-            st.download_button(
-                label="Download result (JSON)",
-                data=io.BytesIO(json_bytes),
-                file_name="corep_c01_result.json",
-                mime="application/json",
-            )
-            # CSV of template extract for spreadsheets
-            rows = [["field_id", "field_label", "value"]]
-            for e in result.get("audit_log", {}).get("entries", []):
-                rows.append([
-                    e.get("field_id", ""),
-                    e.get("field_label", ""),
-                    e.get("value") or "",
-                ])
-            csv_lines = ["\t".join(r) for r in rows]
-            csv_bytes = "\n".join(csv_lines).encode("utf-8")
-            st.download_button(
-                label="Download template extract (TSV)",
-                data=io.BytesIO(csv_bytes),
-                file_name="corep_c01_extract.tsv",
-                mime="text/tab-separated-values",
-            )
-
-        st.caption("This is a prototype. Always verify against the PRA Rulebook and seek human review before submission.")
+            sections = {stage: st.empty() for stage in RENDERERS}
+            result = {}
+            run = _run_cache().get_or_start(*current)
+            with st.spinner("Retrieving rules and generating template..."):
+                for stage, partial in run.iter_stages():
+                    result.update(partial)
+                    with sections[stage].container():
+                        RENDERERS[stage](partial)
+            results[run.key] = result
+            while len(results) > SESSION_RESULTS:
+                results.pop(next(iter(results)))
+        render_export(result, entity_id, current[2])
+    except FileNotFoundError as e:
+        st.error(f"Service not ready: run ingestion first. {e}")
+        st.stop()
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+    except Exception as e:
+        st.error(str(e))
+        raise
+    st.caption("This is a prototype. Always verify against the PRA Rulebook and seek human review before submission.")
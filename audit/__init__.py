@@ -1,4 +1,14 @@
 """Audit log: field → rule paragraphs with citations."""
 from .build import build_audit_log, AuditEntry, AuditLog
+from .store import AuditStore, AuditRun, AuditRunEntry, get_audit_store, close_audit_store
 
-__all__ = ["build_audit_log", "AuditEntry", "AuditLog"]
+__all__ = [
+    "build_audit_log",
+    "AuditEntry",
+    "AuditLog",
+    "AuditStore",
+    "AuditRun",
+    "AuditRunEntry",
+    "get_audit_store",
+    "close_audit_store",
+]
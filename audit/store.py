@@ -0,0 +1,462 @@
+"""
+Persistent audit store: append-only segment log of pipeline runs (fields and citations) with
+secondary indexes by chunk_id, field_id, template_id and reference date.
+
+- Records are JSON lines appended to the writer's active segment by a background thread, which
+  fsyncs once per batch; append() only enqueues, so the request path never waits on disk.
+- Each process writes its own segments (safe with forked API workers); the index is a shared
+  SQLite database (WAL) mapping keys to (segment, offset, length).
+- Sealed segments are merged in the background (compact()) to bound the number of files.
+"""
+import fcntl
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import (
+    AUDIT_DIR,
+    AUDIT_SEGMENT_MAX_BYTES,
+    AUDIT_FSYNC_BATCH,
+    AUDIT_FSYNC_INTERVAL_MS,
+    AUDIT_COMPACT_INTERVAL_S,
+    AUDIT_WRITE_RETRIES,
+)
+from audit.build import AuditLog
+from rag.batching import drain_batch
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    name TEXT PRIMARY KEY,
+    sealed INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    template_id TEXT NOT NULL,
+    reference_date TEXT NOT NULL,
+    recorded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_date ON runs (reference_date);
+CREATE INDEX IF NOT EXISTS runs_by_segment ON runs (segment);
+CREATE TABLE IF NOT EXISTS postings (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    reference_date TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    PRIMARY KEY (kind, key, reference_date, run_id)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass
+class AuditRunEntry:
+    """One field of a persisted run: value and cited chunk_ids."""
+    field_id: str
+    value: str | None
+    citations: list[str] = field(default_factory=list)
+
+
+@dataclass
+class AuditRun:
+    """One pipeline run as persisted in the audit log."""
+    run_id: str
+    recorded_at: str
+    template_id: str
+    reference_date: str
+    question: str = ""
+    scenario: str = ""
+    entries: list[AuditRunEntry] = field(default_factory=list)
+    snapshot_id: str = ""
+
+    @classmethod
+    def from_audit_log(
+        cls,
+        audit: AuditLog,
+        reference_date: str | None,
+        question: str = "",
+        scenario: str = "",
+        snapshot_id: str = "",
+    ) -> "AuditRun":
+        return cls(
+            run_id=uuid.uuid4().hex,
+            recorded_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            template_id=audit.template_id,
+            reference_date=reference_date or "",
+            question=question,
+            scenario=scenario,
+            entries=[
+                AuditRunEntry(e.field_id, e.value, [c.paragraph_id for c in e.citations])
+                for e in audit.entries
+            ],
+            snapshot_id=snapshot_id,
+        )
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _postings(run: AuditRun) -> set[tuple[str, str, str, str]]:
+    rows = {("template", run.template_id, run.reference_date, run.run_id)}
+    for e in run.entries:
+        rows.add(("field", e.field_id, run.reference_date, run.run_id))
+        for cid in e.citations:
+            rows.add(("chunk", cid, run.reference_date, run.run_id))
+    return rows
+
+
+class AuditStore:
+    """Append-only audit log with indexed lookups. One instance per process."""
+
+    def __init__(
+        self,
+        root: Path = AUDIT_DIR,
+        segment_max_bytes: int = AUDIT_SEGMENT_MAX_BYTES,
+        fsync_batch: int = AUDIT_FSYNC_BATCH,
+        fsync_interval_ms: float = AUDIT_FSYNC_INTERVAL_MS,
+        compact_interval_s: float = AUDIT_COMPACT_INTERVAL_S,
+    ):
+        self.root = root
+        self.segments_dir = root / "segments"
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_batch = fsync_batch
+        self.fsync_interval_ms = fsync_interval_ms
+        self._db_path = root / "index.sqlite"
+        self._read = _connect(self._db_path)
+        self._read.executescript(_SCHEMA)
+        self._read_lock = threading.Lock()
+        self._writer_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._seq = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = threading.Event()
+        self._writer_error: BaseException | None = None
+        self._writer = threading.Thread(target=self._write_loop, name="audit-writer", daemon=True)
+        self._writer.start()
+        self._compactor = None
+        if compact_interval_s > 0:
+            self._compactor = threading.Thread(
+                target=self._compact_loop, args=(compact_interval_s,), name="audit-compactor", daemon=True
+            )
+            self._compactor.start()
+
+    # ---- write path -------------------------------------------------------------------------
+
+    def append(self, run: AuditRun) -> str:
+        """Queue a run for persistence and return its run_id (does not wait for disk)."""
+        self._check_writer()
+        if self._closed.is_set():
+            raise RuntimeError("Audit store is closed")
+        self._queue.put(run)
+        return run.run_id
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """
+        Block until everything appended so far is fsynced and indexed. Raises TimeoutError if that
+        takes longer than `timeout`, and RuntimeError if the writer has stopped on an error.
+        """
+        self._check_writer()
+        done = threading.Event()
+        self._queue.put(done)
+        if not done.wait(timeout):
+            raise TimeoutError(f"Audit store flush did not complete within {timeout}s")
+        self._check_writer()
+
+    def close(self) -> None:
+        """Flush pending runs, seal the active segment and stop background threads."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._queue.put(None)
+        self._writer.join()
+
+    def _check_writer(self) -> None:
+        if self._writer_error is not None:
+            raise RuntimeError(f"Audit writer stopped: {self._writer_error!r}") from self._writer_error
+
+    def _new_segment_name(self) -> str:
+        self._seq += 1
+        return f"seg-{self._writer_id}-{self._seq:06d}.log"
+
+    def _write_loop(self) -> None:
+        state = {"conn": None, "name": None, "fh": None}
+        waiters: list[threading.Event] = []
+        try:
+            state["conn"] = _connect(self._db_path)
+            while True:
+                first = self._queue.get()
+                batch, stop = ([], True) if first is None else drain_batch(
+                    lambda timeout: self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait(),
+                    first,
+                    self.fsync_batch,
+                    self.fsync_interval_ms,
+                    lambda item: 1,
+                )
+                runs = [r for r in batch if isinstance(r, AuditRun)]
+                waiters = [r for r in batch if isinstance(r, threading.Event)]
+                if runs:
+                    self._write_with_retry(state, runs)
+                for w in waiters:
+                    w.set()
+                if stop:
+                    if state["fh"] is not None:
+                        self._seal(state["conn"], state["name"], state["fh"])
+                    return
+        except BaseException as e:
+            # Unrecoverable: make append()/flush() raise instead of queueing into the void
+            self._writer_error = e
+            logger.exception("Audit writer stopped; %d queued item(s) not persisted", self._queue.qsize())
+            for w in waiters:
+                w.set()
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+        finally:
+            if state["conn"] is not None:
+                state["conn"].close()
+
+    def _write_with_retry(self, state: dict, runs: list[AuditRun]) -> None:
+        for attempt in range(1, AUDIT_WRITE_RETRIES + 1):
+            try:
+                self._write_batch(state, runs)
+                return
+            except (OSError, sqlite3.Error) as e:
+                if attempt == AUDIT_WRITE_RETRIES:
+                    raise
+                logger.warning("Audit batch of %d run(s) failed (attempt %d): %r; retrying", len(runs), attempt, e)
+                # Continue in a fresh segment: the failed one may end in a partial record
+                if state["fh"] is not None:
+                    try:
+                        self._seal(state["conn"], state["name"], state["fh"])
+                    except (OSError, sqlite3.Error):
+                        pass
+                    state["fh"] = None
+                time.sleep(min(2 ** attempt * 0.1, 5.0))
+
+    def _write_batch(self, state: dict, runs: list[AuditRun]) -> None:
+        conn, fh = state["conn"], state["fh"]
+        if fh is None or fh.tell() >= self.segment_max_bytes:
+            if fh is not None:
+                self._seal(conn, state["name"], fh)
+                state["fh"] = None
+            self.segments_dir.mkdir(parents=True, exist_ok=True)
+            name = self._new_segment_name()
+            fh = open(self.segments_dir / name, "ab")
+            state["name"], state["fh"] = name, fh
+            with conn:
+                conn.execute("INSERT OR IGNORE INTO segments (name) VALUES (?)", (name,))
+        name = state["name"]
+        rows, postings = [], set()
+        for run in runs:
+            line = (json.dumps(asdict(run), ensure_ascii=False) + "\n").encode("utf-8")
+            offset = fh.tell()
+            fh.write(line)
+            rows.append((run.run_id, name, offset, len(line), run.template_id, run.reference_date, run.recorded_at))
+            postings |= _postings(run)
+        # One fsync per batch, then index: an indexed run is always durable on disk
+        fh.flush()
+        os.fsync(fh.fileno())
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany("INSERT OR IGNORE INTO postings VALUES (?, ?, ?, ?)", postings)
+            conn.execute("UPDATE segments SET bytes = ? WHERE name = ?", (fh.tell(), name))
+
+    @staticmethod
+    def _seal(conn: sqlite3.Connection, name: str, fh) -> None:
+        fh.close()
+        with conn:
+            conn.execute("UPDATE segments SET sealed = 1 WHERE name = ?", (name,))
+
+    # ---- read path --------------------------------------------------------------------------
+
+    def find_runs(
+        self,
+        chunk_id: str | None = None,
+        field_id: str | None = None,
+        template_id: str | None = None,
+        date_from: str | None = None,
+        date_to: str | None = None,
+        limit: int = 100,
+    ) -> list[dict]:
+        """
+        Runs matching all given filters (reference dates as YYYY-MM-DD, inclusive), newest
+        reference date first. Returns summaries: run_id, template_id, reference_date, recorded_at.
+        """
+        keys = [(k, v) for k, v in (("chunk", chunk_id), ("field", field_id), ("template", template_id)) if v is not None]
+        sql, where, params = [], [], []
+        if keys:
+            # Walk the first posting list backwards along its primary key, so LIMIT stops the scan;
+            # other filters are point lookups on (kind, key, reference_date, run_id)
+            sql.append("SELECT r.run_id, r.template_id, r.reference_date, r.recorded_at FROM postings d")
+            for i, (kind, key) in enumerate(keys[1:]):
+                sql.append(
+                    f"CROSS JOIN postings p{i} ON p{i}.kind = ? AND p{i}.key = ? "
+                    f"AND p{i}.reference_date = d.reference_date AND p{i}.run_id = d.run_id"
+                )
+                params += [kind, key]
+            sql.append("CROSS JOIN runs r ON r.run_id = d.run_id")
+            where.append("d.kind = ? AND d.key = ?")
+            params += list(keys[0])
+            column, order = "d.reference_date", "d.reference_date DESC, d.run_id DESC"
+        else:
+            sql.append("SELECT r.run_id, r.template_id, r.reference_date, r.recorded_at FROM runs r")
+            column, order = "r.reference_date", "r.reference_date DESC"
+        if date_from:
+            where.append(f"{column} >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append(f"{column} <= ?")
+            params.append(date_to)
+        if where:
+            sql.append("WHERE " + " AND ".join(where))
+        sql.append(f"ORDER BY {order} LIMIT ?")
+        params.append(limit)
+        with self._read_lock:
+            rows = self._read.execute(" ".join(sql), params).fetchall()
+        return [
+            {"run_id": r[0], "template_id": r[1], "reference_date": r[2] or None, "recorded_at": r[3]}
+            for r in rows
+        ]
+
+    def get_run(self, run_id: str) -> dict | None:
+        """Full persisted record for one run, or None if unknown (or not yet flushed)."""
+        for _ in range(2):
+            with self._read_lock:
+                row = self._read.execute(
+                    "SELECT segment, offset, length FROM runs WHERE run_id = ?", (run_id,)
+                ).fetchone()
+            if row is None:
+                return None
+            try:
+                with open(self.segments_dir / row[0], "rb") as f:
+                    f.seek(row[1])
+                    return json.loads(f.read(row[2]))
+            except FileNotFoundError:
+                # Segment was compacted between lookup and read: the index now points elsewhere
+                continue
+        return None
+
+    # ---- compaction -------------------------------------------------------------------------
+
+    def _compact_loop(self, interval_s: float) -> None:
+        while not self._closed.wait(interval_s):
+            try:
+                self.compact()
+            except Exception:
+                # Compaction is an optimisation; the log stays valid if it fails
+                pass
+
+    @staticmethod
+    def _seal_orphans(conn: sqlite3.Connection) -> None:
+        # Active segments of writers that are gone (killed, or exited without close()) never get sealed
+        # by their owner; seal them so compaction can merge them
+        orphans = []
+        for (name,) in conn.execute("SELECT name FROM segments WHERE sealed = 0"):
+            pid = name.split("-")[1]
+            if not pid.isdigit():
+                continue
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                orphans.append((name,))
+            except PermissionError:
+                pass
+        if orphans:
+            with conn:
+                conn.executemany("UPDATE segments SET sealed = 1 WHERE name = ?", orphans)
+
+    def compact(self, min_segments: int = 2) -> int:
+        """
+        Merge sealed segments smaller than segment_max_bytes into one new sealed segment and repoint
+        the index. Returns the number of segments merged (0 if another process is compacting).
+        """
+        lock_path = self.root / "compact.lock"
+        with open(lock_path, "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            conn = _connect(self._db_path)
+            try:
+                self._seal_orphans(conn)
+                small = [r[0] for r in conn.execute(
+                    "SELECT name FROM segments WHERE sealed = 1 AND bytes < ? ORDER BY name", (self.segment_max_bytes,)
+                )]
+                if len(small) < min_segments:
+                    return 0
+                merged_name = f"seg-compact-{uuid.uuid4().hex[:12]}.log"
+                updates, merged = [], []
+                with open(self.segments_dir / merged_name, "wb") as out:
+                    for name in small:
+                        if out.tell() >= self.segment_max_bytes:
+                            break
+                        src = self.segments_dir / name
+                        if not src.exists():
+                            continue
+                        base = out.tell()
+                        rows = conn.execute("SELECT run_id, offset FROM runs WHERE segment = ?", (name,)).fetchall()
+                        with open(src, "rb") as f:
+                            out.write(f.read())
+                        updates += [(merged_name, base + offset, run_id) for run_id, offset in rows]
+                        merged.append(name)
+                    out.flush()
+                    os.fsync(out.fileno())
+                    size = out.tell()
+                with conn:
+                    conn.execute("INSERT INTO segments (name, sealed, bytes) VALUES (?, 1, ?)", (merged_name, size))
+                    conn.executemany("UPDATE runs SET segment = ?, offset = ? WHERE run_id = ?", updates)
+                    conn.executemany("DELETE FROM segments WHERE name = ?", [(n,) for n in merged])
+                for name in merged:
+                    try:
+                        (self.segments_dir / name).unlink()
+                    except FileNotFoundError:
+                        pass
+                return len(merged)
+            finally:
+                conn.close()
+
+
+_store: AuditStore | None = None
+_store_pid: int | None = None
+_store_lock = threading.Lock()
+
+
+def close_audit_store() -> None:
+    """Flush and close this process's audit store, if it has one (for exits that skip atexit)."""
+    if _store is not None and _store_pid == os.getpid():
+        _store.close()
+
+
+def get_audit_store() -> AuditStore:
+    """Process-wide audit store (re-created after fork so each worker has its own writer)."""
+    global _store, _store_pid
+    if _store is None or _store_pid != os.getpid():
+        with _store_lock:
+            if _store is None or _store_pid != os.getpid():
+                import atexit
+                _store = AuditStore()
+                _store_pid = os.getpid()
+                atexit.register(_store.close)
+    return _store
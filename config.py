@@ -10,7 +10,9 @@ load_dotenv(BASE_DIR / ".env")
 DATA_DIR = BASE_DIR / "data"
 CORPUS_DIR = DATA_DIR / "corpus"
 INDEX_DIR = BASE_DIR / "index_store"
+AUDIT_DIR = INDEX_DIR / "audit"
 SCHEMA_DIR = BASE_DIR / "schemas"
+EXPORT_DIR = BASE_DIR / "exports"
 
 INDEX_DIR.mkdir(parents=True, exist_ok=True)
 CORPUS_DIR.mkdir(parents=True, exist_ok=True)
@@ -18,10 +20,20 @@ SCHEMA_DIR.mkdir(parents=True, exist_ok=True)
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# Embedding backend: "torch" (sentence-transformers) or "onnx" (exported model, see rag/onnx_encoder.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
 CHROMA_PERSIST_DIR = str(INDEX_DIR / "chroma")
 BM25_INDEX_PATH = INDEX_DIR / "bm25_index.pkl"
 CHUNKS_JSON_PATH = INDEX_DIR / "chunks.json"
+# Compact chunk store: all texts in one blob + columnar metadata/offsets
+CHUNK_TEXTS_PATH = INDEX_DIR / "chunk_texts.bin"
+CHUNK_META_PATH = INDEX_DIR / "chunk_meta.json"
+EMBEDDINGS_NPY_PATH = INDEX_DIR / "embeddings.npy"
+ONNX_MODEL_DIR = INDEX_DIR / "onnx" / EMBEDDING_MODEL.replace("/", "__")
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "1") == "1"
+# Minimum per-text cosine similarity between ONNX and torch embeddings accepted at export
+ONNX_MIN_COSINE = float(os.getenv("ONNX_MIN_COSINE", "0.99"))
 
 # RAG
 CHUNK_MAX_TOKENS = 400
@@ -29,3 +41,61 @@ TOP_K_SPARSE = 10
 TOP_K_DENSE = 10
 TOP_K_FUSION = 15
 TOP_K_FINAL = 8
+RRF_K = 60
+# Dense index used by load_retriever: "chroma" or "mmap" (embeddings.npy shared across workers)
+DENSE_INDEX = os.getenv("DENSE_INDEX", "chroma")
+
+# Multi-worker serving (api/serve.py)
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8000"))
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "2"))
+# Encode queries in one shared embedding process instead of one model per API worker
+EMBEDDING_WORKER = os.getenv("EMBEDDING_WORKER", "0") == "1"
+
+# Query encoding: micro-batch concurrent encode calls into one forward pass
+EMBED_BATCHING = os.getenv("EMBED_BATCHING", "1") == "1"
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+# Encoder thread pools (torch, and intra-op for onnxruntime; 0 = library default); keep workers x threads <= cores
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))
+TORCH_INTEROP_THREADS = int(os.getenv("TORCH_INTEROP_THREADS", "0"))
+
+# Audit persistence (audit/store.py): append-only segments + SQLite secondary index
+AUDIT_STORE_ENABLED = os.getenv("AUDIT_STORE_ENABLED", "1") == "1"
+AUDIT_SEGMENT_MAX_BYTES = int(os.getenv("AUDIT_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+# fsync once per batch of up to N runs or after the interval, whichever comes first
+AUDIT_FSYNC_BATCH = int(os.getenv("AUDIT_FSYNC_BATCH", "256"))
+AUDIT_FSYNC_INTERVAL_MS = float(os.getenv("AUDIT_FSYNC_INTERVAL_MS", "50"))
+AUDIT_COMPACT_INTERVAL_S = float(os.getenv("AUDIT_COMPACT_INTERVAL_S", "300"))
+# Attempts per batch (with backoff) before the audit writer gives up and append() starts raising
+AUDIT_WRITE_RETRIES = int(os.getenv("AUDIT_WRITE_RETRIES", "5"))
+
+# Export (export/): XBRL-CSV report packages
+XBRL_BASE_CURRENCY = os.getenv("XBRL_BASE_CURRENCY", "GBP")
+XBRL_ENTRY_POINT = os.getenv(
+    "XBRL_ENTRY_POINT",
+    "http://www.eba.europa.eu/eu/fr/xbrl/crr/fws/corep/4.0/mod/corep_of.json",
+)
+
+# Background jobs (jobs/): SQLite queue + local worker pool
+JOBS_DB_PATH = INDEX_DIR / "jobs.sqlite"
+# Worker processes started inside the API process (0 = run `python -m jobs.worker` separately).
+# api.serve starts them in its first worker only; `uvicorn --workers N` would start N pools.
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "0"))
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+# A running job whose worker stops heartbeating for this long is re-claimed by another worker
+JOBS_LEASE_S = float(os.getenv("JOBS_LEASE_S", "300"))
+JOBS_POLL_INTERVAL_S = float(os.getenv("JOBS_POLL_INTERVAL_S", "1"))
+
+# Versioned index snapshots (rag/snapshots.py): point-in-time retrieval by reference date
+SNAPSHOT_DIR = INDEX_DIR / "snapshots"
+# Loaded snapshot retrievers kept per process (least recently used are dropped)
+SNAPSHOT_CACHE_SIZE = int(os.getenv("SNAPSHOT_CACHE_SIZE", "4"))
+# How often the snapshot registry is re-checked for newly published snapshots
+SNAPSHOT_REFRESH_S = float(os.getenv("SNAPSHOT_REFRESH_S", "5"))
+
+# Streamlit UI: pipeline runs execute on a shared thread pool; results are memoised per
+# (question, scenario, template, index version) across sessions for UI_RESULT_TTL_S seconds
+UI_PIPELINE_THREADS = int(os.getenv("UI_PIPELINE_THREADS", "8"))
+UI_RESULT_CACHE_SIZE = int(os.getenv("UI_RESULT_CACHE_SIZE", "256"))
+UI_RESULT_TTL_S = float(os.getenv("UI_RESULT_TTL_S", "3600"))
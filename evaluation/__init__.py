@@ -0,0 +1,26 @@
+"""Offline evaluation of retrieval quality and latency."""
+from .metrics import recall_at_k, reciprocal_rank, ndcg_at_k
+from .harness import (
+    GoldenQuery,
+    EvalConfig,
+    EvalResult,
+    load_golden_set,
+    config_grid,
+    run_grid,
+    pareto_front,
+    format_pareto_table,
+)
+
+__all__ = [
+    "recall_at_k",
+    "reciprocal_rank",
+    "ndcg_at_k",
+    "GoldenQuery",
+    "EvalConfig",
+    "EvalResult",
+    "load_golden_set",
+    "config_grid",
+    "run_grid",
+    "pareto_front",
+    "format_pareto_table",
+]
@@ -0,0 +1,78 @@
+"""
+Benchmark query micro-batching (rag.batching.BatchingEncoder) against direct encode calls:
+sequential latency (a single user, where batching must not add delay) and throughput with
+concurrent callers (where batching should raise queries/s per core).
+
+Usage:
+    python -m evaluation.batching_bench [--backend torch] [--concurrency 1,4,16,32] [--queries 400]
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import EMBEDDING_BACKEND, EMBED_BATCH_MAX_SIZE, EMBED_BATCH_MAX_WAIT_MS, TORCH_NUM_THREADS
+from evaluation.encoder_bench import SAMPLE_QUERIES
+
+
+def _sequential_ms(encoder, n_queries: int) -> tuple[float, float]:
+    latencies = []
+    for i in range(n_queries):
+        t = time.perf_counter()
+        encoder.encode([SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]], show_progress_bar=False)
+        latencies.append((time.perf_counter() - t) * 1000)
+    return statistics.median(latencies), sorted(latencies)[int(0.95 * (len(latencies) - 1))]
+
+
+def _concurrent_qps(encoder, concurrency: int, n_queries: int) -> float:
+    per_thread = max(1, n_queries // concurrency)
+
+    def worker(offset: int) -> None:
+        for i in range(per_thread):
+            encoder.encode([SAMPLE_QUERIES[(offset + i) % len(SAMPLE_QUERIES)]], show_progress_bar=False)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    t = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return per_thread * concurrency / (time.perf_counter() - t)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare micro-batched and direct query encoding.")
+    parser.add_argument("--backend", default=EMBEDDING_BACKEND)
+    parser.add_argument("--concurrency", type=lambda s: [int(x) for x in s.split(",")], default=[1, 4, 16, 32])
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--max-batch-size", type=int, default=EMBED_BATCH_MAX_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=EMBED_BATCH_MAX_WAIT_MS)
+    args = parser.parse_args(argv)
+
+    from rag.batching import BatchingEncoder, configure_torch_threads
+    from rag.encoders import load_embedding_model
+
+    configure_torch_threads()
+    model = load_embedding_model(args.backend)
+    batching = BatchingEncoder(model, args.max_batch_size, args.max_wait_ms)
+    model.encode([SAMPLE_QUERIES[0]], show_progress_bar=False)
+    batching.encode([SAMPLE_QUERIES[0]])
+    cores = TORCH_NUM_THREADS or os.cpu_count() or 1
+
+    n_seq = max(20, args.queries // 10)
+    print(f"backend={args.backend} cores={cores} max_batch_size={args.max_batch_size} max_wait_ms={args.max_wait_ms}")
+    print(f"{'mode':9} {'seq p50 ms':>10} {'seq p95 ms':>10} " + " ".join(f"{f'qps@{c}':>9}" for c in args.concurrency))
+    for name, encoder in (("direct", model), ("batching", batching)):
+        p50, p95 = _sequential_ms(encoder, n_seq)
+        qps = [_concurrent_qps(encoder, c, args.queries) for c in args.concurrency]
+        print(f"{name:9} {p50:10.2f} {p95:10.2f} " + " ".join(f"{q:9.1f}" for q in qps))
+    print(f"(qps per core = qps / {cores})")
+    batching.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark embedding backends (torch vs ONNX): startup time, query encode latency, batch throughput,
+peak RSS, and agreement with the torch embeddings the index was built with.
+Each backend runs in a fresh process so startup and RSS are not shared.
+
+Usage:
+    python -m evaluation.encoder_bench [--backends torch,onnx] [--queries 50]
+"""
+import argparse
+import multiprocessing as mp
+import resource
+import statistics
+import time
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SAMPLE_QUERIES = [
+    "Question: What makes up Common Equity Tier 1 capital?. Scenario: Quarterly COREP return as at 31 Dec 2024",
+    "Question: How is total eligible own funds calculated?. Scenario:",
+    "Question: Which reference date should be used when completing C 01.00?. Scenario: Q4 2024",
+]
+
+
+def _bench_backend(backend: str, n_queries: int, out: "mp.Queue") -> None:
+    from rag.encoders import load_embedding_model
+    from rag.ingest import load_corpus
+    # Startup = backend import + model load (torch / onnxruntime are only imported here)
+    t0 = time.perf_counter()
+    model = load_embedding_model(backend)
+    startup_s = time.perf_counter() - t0
+
+    model.encode([SAMPLE_QUERIES[0]], show_progress_bar=False)
+    latencies = []
+    for i in range(n_queries):
+        t = time.perf_counter()
+        model.encode([SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]], show_progress_bar=False)
+        latencies.append((time.perf_counter() - t) * 1000)
+
+    texts = [c["text"] for c in load_corpus()]
+    t = time.perf_counter()
+    model.encode(texts, show_progress_bar=False)
+    batch_s = time.perf_counter() - t
+
+    out.put({
+        "backend": backend,
+        "startup_s": startup_s,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+        "batch_texts_per_s": len(texts) / batch_s if batch_s else float("inf"),
+        # ru_maxrss is in KiB on Linux
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def _compat(backend: str, out: "mp.Queue") -> None:
+    from rag.encoders import load_embedding_model
+    from rag.ingest import load_corpus
+    from rag.onnx_encoder import check_compatibility
+    texts = [c["text"] for c in load_corpus()] + SAMPLE_QUERIES
+    out.put(check_compatibility(load_embedding_model("torch"), load_embedding_model(backend), texts, min_cosine=-1.0))
+
+
+def _run(target, *args):
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    p = ctx.Process(target=target, args=(*args, out))
+    p.start()
+    result = out.get()
+    p.join()
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare embedding backends.")
+    parser.add_argument("--backends", type=lambda s: s.split(","), default=["torch", "onnx"])
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    rows = [_run(_bench_backend, b, args.queries) for b in args.backends]
+    print(f"{'backend':8} {'startup s':>9} {'p50 ms':>8} {'p95 ms':>8} {'texts/s':>9} {'RSS MB':>8} {'min cos':>8}")
+    for r in rows:
+        cos = 1.0 if r["backend"] == "torch" else _run(_compat, r["backend"])
+        print(f"{r['backend']:8} {r['startup_s']:9.2f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} "
+              f"{r['batch_texts_per_s']:9.1f} {r['rss_mb']:8.1f} {cos:8.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Offline retrieval evaluation: run a golden query set through the retriever under a grid of
+configurations (in parallel worker processes) and report quality next to latency and memory.
+
+Usage:
+    python -m evaluation.harness --sparse 5,10 --dense 5,10 --fusion 10,15 --rrf-k 30,60 --workers 4
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import (
+    DATA_DIR,
+    TOP_K_SPARSE,
+    TOP_K_DENSE,
+    TOP_K_FUSION,
+    TOP_K_FINAL,
+    RRF_K,
+    TORCH_NUM_THREADS,
+)
+from rag.bm25_tokenizers import TOKENIZERS
+from evaluation.metrics import recall_at_k, reciprocal_rank, ndcg_at_k
+
+GOLDEN_SET_PATH = DATA_DIR / "eval" / "golden_queries.json"
+
+
+@dataclass
+class GoldenQuery:
+    """One golden query: question, scenario, optional template filter and the chunk_ids that should be cited."""
+    question: str
+    scenario: str
+    expected_chunk_ids: list[str]
+    template_filter: str | None = None
+
+
+@dataclass(frozen=True)
+class EvalConfig:
+    """One retriever configuration in the grid."""
+    top_k_sparse: int = TOP_K_SPARSE
+    top_k_dense: int = TOP_K_DENSE
+    top_k_fusion: int = TOP_K_FUSION
+    top_k_final: int = TOP_K_FINAL
+    rrf_k: int = RRF_K
+    tokenizer: str = "default"
+
+    def label(self) -> str:
+        return (
+            f"sparse={self.top_k_sparse} dense={self.top_k_dense} fusion={self.top_k_fusion} "
+            f"final={self.top_k_final} rrf_k={self.rrf_k} tok={self.tokenizer}"
+        )
+
+
+@dataclass
+class EvalResult:
+    """Aggregate quality, latency and memory for one configuration."""
+    config: EvalConfig
+    recall: float
+    mrr: float
+    ndcg: float
+    latency_p50_ms: float
+    latency_p95_ms: float
+    peak_alloc_kb: float
+    index_kb: float
+    misses: list[str] = field(default_factory=list)
+
+
+def load_golden_set(path: Path = GOLDEN_SET_PATH) -> list[GoldenQuery]:
+    """Load golden queries from JSON (list of objects with question, scenario, expected_chunk_ids)."""
+    if not path.exists():
+        raise FileNotFoundError(f"Golden set not found: {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [
+        GoldenQuery(
+            question=q["question"],
+            scenario=q.get("scenario", ""),
+            expected_chunk_ids=list(q["expected_chunk_ids"]),
+            template_filter=q.get("template_filter"),
+        )
+        for q in data
+    ]
+
+
+def config_grid(
+    sparse: list[int],
+    dense: list[int],
+    fusion: list[int],
+    final: list[int],
+    rrf_k: list[int],
+    tokenizers: list[str],
+) -> list[EvalConfig]:
+    """Cartesian product of parameter values; skips configs where fusion < final."""
+    configs = []
+    for s, d, fu, fi, k, tok in itertools.product(sparse, dense, fusion, final, rrf_k, tokenizers):
+        if tok not in TOKENIZERS:
+            raise ValueError(f"Unknown tokenizer: {tok}")
+        if fu < fi:
+            continue
+        configs.append(EvalConfig(s, d, fu, fi, k, tok))
+    return configs
+
+
+# Per-process state: the base retriever (chunk store, dense index, embedding model) is loaded
+# once per worker, and BM25 indices are built once per tokenizer, each with its own size measured
+# at build time (so the reported memory does not depend on which configs a worker ran before).
+_WORKER: dict = {}
+
+
+def _init_worker(num_threads: int = TORCH_NUM_THREADS) -> None:
+    from rag.retriever import load_query_encoder, load_retriever
+    # Concurrent workers each get their own share of the cores, so a config's latency does not
+    # depend on which configs happened to run alongside it
+    _WORKER["base"] = load_retriever(embedding_model=load_query_encoder(num_threads=num_threads))
+    _WORKER["bm25"] = {}
+
+
+def _build_retriever(config: EvalConfig):
+    """Retriever for `config` and the allocated size (KB) of its tokenizer's BM25 index."""
+    from rank_bm25 import BM25Okapi
+    from rag.retriever import Retriever
+
+    base = _WORKER["base"]
+    tokenizer = TOKENIZERS[config.tokenizer]
+    if config.tokenizer not in _WORKER["bm25"]:
+        tracemalloc.start()
+        bm25 = BM25Okapi([tokenizer(text) for text in base.store.iter_texts()])
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        _WORKER["bm25"][config.tokenizer] = (bm25, size / 1024)
+    bm25, index_kb = _WORKER["bm25"][config.tokenizer]
+    return Retriever(
+        chunks=base.store,
+        bm25=bm25,
+        chroma_collection=base.chroma_collection,
+        embedding_model=base.embedding_model,
+        top_k_sparse=config.top_k_sparse,
+        top_k_dense=config.top_k_dense,
+        top_k_fusion=config.top_k_fusion,
+        top_k_final=config.top_k_final,
+        rrf_k=config.rrf_k,
+        tokenizer=tokenizer,
+    ), index_kb
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def evaluate_config(config: EvalConfig, golden: list[GoldenQuery], repeats: int = 3) -> EvalResult:
+    """Evaluate one configuration in the current process (worker state must be initialised)."""
+    retriever, index_kb = _build_retriever(config)
+    k = config.top_k_final
+
+    # Warm-up so model/kernel initialisation is not counted as query latency
+    retriever.retrieve(question=golden[0].question, scenario=golden[0].scenario)
+
+    recalls, rrs, ndcgs, misses = [], [], [], []
+    latencies: list[float] = []
+    for q in golden:
+        retrieved: list[str] = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            out = retriever.retrieve(question=q.question, scenario=q.scenario, template_filter=q.template_filter)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            retrieved = [c["chunk_id"] for c in out]
+        recalls.append(recall_at_k(retrieved, q.expected_chunk_ids, k))
+        rrs.append(reciprocal_rank(retrieved, q.expected_chunk_ids))
+        ndcgs.append(ndcg_at_k(retrieved, q.expected_chunk_ids, k))
+        misses.extend(cid for cid in q.expected_chunk_ids if cid not in retrieved[:k])
+
+    # Separate pass for allocations so tracemalloc overhead does not distort latency
+    tracemalloc.start()
+    for q in golden:
+        retriever.retrieve(question=q.question, scenario=q.scenario, template_filter=q.template_filter)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return EvalResult(
+        config=config,
+        recall=statistics.fmean(recalls),
+        mrr=statistics.fmean(rrs),
+        ndcg=statistics.fmean(ndcgs),
+        latency_p50_ms=_percentile(latencies, 50),
+        latency_p95_ms=_percentile(latencies, 95),
+        peak_alloc_kb=peak / 1024,
+        index_kb=index_kb,
+        misses=sorted(set(misses)),
+    )
+
+
+def _evaluate_in_worker(args: tuple[EvalConfig, list[GoldenQuery], int]) -> EvalResult:
+    config, golden, repeats = args
+    return evaluate_config(config, golden, repeats)
+
+
+def run_grid(
+    configs: list[EvalConfig],
+    golden: list[GoldenQuery],
+    workers: int = 2,
+    repeats: int = 3,
+) -> list[EvalResult]:
+    """Evaluate every config; configs are distributed over `workers` processes, each with a warm retriever."""
+    if not golden:
+        raise ValueError("Golden set is empty")
+    if workers <= 1:
+        _init_worker()
+        return [evaluate_config(c, golden, repeats) for c in configs]
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(num_threads,)) as pool:
+        return list(pool.map(_evaluate_in_worker, [(c, golden, repeats) for c in configs]))
+
+
+def pareto_front(results: list[EvalResult]) -> list[EvalResult]:
+    """Configs not dominated on (higher recall, lower p50 latency)."""
+    front = []
+    for r in results:
+        dominated = any(
+            o.recall >= r.recall and o.latency_p50_ms <= r.latency_p50_ms
+            and (o.recall > r.recall or o.latency_p50_ms < r.latency_p50_ms)
+            for o in results
+        )
+        if not dominated:
+            front.append(r)
+    return sorted(front, key=lambda r: r.latency_p50_ms)
+
+
+def pick_fastest(results: list[EvalResult], min_recall: float) -> EvalResult | None:
+    """Fastest config whose citation recall is at least `min_recall`."""
+    eligible = [r for r in results if r.recall >= min_recall - 1e-9]
+    return min(eligible, key=lambda r: r.latency_p50_ms) if eligible else None
+
+
+def format_pareto_table(results: list[EvalResult]) -> str:
+    """Plain-text table of all results sorted by latency; Pareto-optimal rows are marked with '*'."""
+    front = {id(r) for r in pareto_front(results)}
+    header = f"{'':1} {'recall':>6} {'MRR':>6} {'nDCG':>6} {'p50 ms':>8} {'p95 ms':>8} {'alloc KB':>9} {'BM25 KB':>8}  config"
+    lines = [header, "-" * len(header)]
+    for r in sorted(results, key=lambda r: (r.latency_p50_ms, -r.recall)):
+        mark = "*" if id(r) in front else ""
+        lines.append(
+            f"{mark:1} {r.recall:6.3f} {r.mrr:6.3f} {r.ndcg:6.3f} {r.latency_p50_ms:8.2f} "
+            f"{r.latency_p95_ms:8.2f} {r.peak_alloc_kb:9.1f} {r.index_kb:8.1f}  {r.config.label()}"
+        )
+    return "\n".join(lines)
+
+
+def _int_list(s: str) -> list[int]:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Evaluate retriever configurations against a golden query set.")
+    parser.add_argument("--golden", type=Path, default=GOLDEN_SET_PATH)
+    parser.add_argument("--sparse", type=_int_list, default=[TOP_K_SPARSE])
+    parser.add_argument("--dense", type=_int_list, default=[TOP_K_DENSE])
+    parser.add_argument("--fusion", type=_int_list, default=[TOP_K_FUSION])
+    parser.add_argument("--final", type=_int_list, default=[TOP_K_FINAL])
+    parser.add_argument("--rrf-k", type=_int_list, default=[RRF_K])
+    parser.add_argument("--tokenizer", type=lambda s: s.split(","), default=["default"])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--min-recall", type=float, default=None,
+                        help="Recall floor for the recommendation (default: recall of the config.py settings)")
+    parser.add_argument("--json", type=Path, default=None, help="Also write raw results to this JSON file")
+    args = parser.parse_args(argv)
+
+    golden = load_golden_set(args.golden)
+    configs = config_grid(args.sparse, args.dense, args.fusion, args.final, args.rrf_k, args.tokenizer)
+    baseline = EvalConfig()
+    if baseline not in configs:
+        configs.append(baseline)
+    results = run_grid(configs, golden, workers=args.workers, repeats=args.repeats)
+
+    print(format_pareto_table(results))
+    baseline_result = next(r for r in results if r.config == baseline)
+    min_recall = args.min_recall if args.min_recall is not None else baseline_result.recall
+    best = pick_fastest(results, min_recall)
+    print()
+    if best:
+        print(f"Fastest config with recall >= {min_recall:.3f}: {best.config.label()} ({best.latency_p50_ms:.2f} ms p50)")
+    else:
+        print(f"No config reaches recall >= {min_recall:.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
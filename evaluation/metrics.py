@@ -0,0 +1,29 @@
+"""Ranking metrics for retrieved chunk_ids against expected (golden) chunk_ids."""
+import math
+
+
+def recall_at_k(retrieved: list[str], expected: list[str], k: int) -> float:
+    """Fraction of expected chunk_ids found in the top-k retrieved."""
+    if not expected:
+        return 1.0
+    top = set(retrieved[:k])
+    return sum(1 for cid in expected if cid in top) / len(expected)
+
+
+def reciprocal_rank(retrieved: list[str], expected: list[str]) -> float:
+    """1 / rank of the first expected chunk_id; 0.0 if none retrieved."""
+    wanted = set(expected)
+    for rank, cid in enumerate(retrieved, start=1):
+        if cid in wanted:
+            return 1 / rank
+    return 0.0
+
+
+def ndcg_at_k(retrieved: list[str], expected: list[str], k: int) -> float:
+    """Binary-relevance nDCG@k."""
+    if not expected:
+        return 1.0
+    wanted = set(expected)
+    dcg = sum(1 / math.log2(rank + 1) for rank, cid in enumerate(retrieved[:k], start=1) if cid in wanted)
+    ideal = sum(1 / math.log2(rank + 1) for rank in range(1, min(len(wanted), k) + 1))
+    return dcg / ideal if ideal else 0.0
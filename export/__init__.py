@@ -0,0 +1,17 @@
+"""Export of populated templates: XBRL-CSV report packages and TSV/HTML views."""
+from .layouts import get_layout, TemplateLayout
+from .xbrl_csv import ExportItem, ReportPackageWriter, export_packages, iter_items_from_jsonl, iter_items_from_job
+from .views import write_tsv, write_html, iter_tsv_rows
+
+__all__ = [
+    "get_layout",
+    "TemplateLayout",
+    "ExportItem",
+    "ReportPackageWriter",
+    "export_packages",
+    "iter_items_from_jsonl",
+    "iter_items_from_job",
+    "write_tsv",
+    "write_html",
+    "iter_tsv_rows",
+]
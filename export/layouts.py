@@ -0,0 +1,53 @@
+"""Precompiled row layouts per COREP template (row order, labels, XBRL-CSV datapoint keys)."""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from schemas.corep_ca1 import CA1_FIELD_LABELS, CA1_REQUIRED_FIELD_IDS, CA1_XBRL_DATAPOINTS
+
+
+@dataclass(frozen=True)
+class LayoutRow:
+    """One template row: field_id, label, and the CSV line prefix for its datapoint."""
+    field_id: str
+    label: str
+    datapoint: str
+    csv_prefix: str
+
+
+@dataclass(frozen=True)
+class TemplateLayout:
+    """Everything about a template that does not depend on the reported values."""
+    template_id: str
+    filing_indicator: str
+    table_file: str
+    rows: tuple[LayoutRow, ...]
+    field_ids: frozenset[str]
+
+
+_TEMPLATES = {
+    # template_id: (filing indicator code, table file, ordered field_ids, labels, datapoints)
+    "C 01.00": ("C_01.00", "c_01.00.csv", CA1_REQUIRED_FIELD_IDS, CA1_FIELD_LABELS, CA1_XBRL_DATAPOINTS),
+}
+
+
+# Template code at the start of an id as written by the LLM: "C 01.00 Own Funds", "C_01.00", "c01.00"
+_TEMPLATE_CODE = re.compile(r"^\s*C\s*_?(\d{2})\.(\d{2})(?!\d)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=None)
+def get_layout(template_id: str) -> TemplateLayout:
+    """Compile (once) and return the layout for a template; raises ValueError if unsupported."""
+    if template_id.strip().upper() == "CA1":
+        template_id = "C 01.00"
+    m = _TEMPLATE_CODE.match(template_id)
+    if m:
+        template_id = f"C {m[1]}.{m[2]}"
+    if template_id not in _TEMPLATES:
+        raise ValueError(f"No export layout for template {template_id}")
+    indicator, table_file, field_ids, labels, datapoints = _TEMPLATES[template_id]
+    rows = tuple(
+        LayoutRow(fid, labels.get(fid, fid), datapoints[fid], f"{datapoints[fid]},")
+        for fid in field_ids
+    )
+    return TemplateLayout(template_id, indicator, table_file, rows, frozenset(field_ids))
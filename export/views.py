@@ -0,0 +1,45 @@
+"""Streaming TSV and HTML views of populated templates (for review alongside XBRL-CSV)."""
+from typing import IO, Iterable, Iterator
+
+from schemas.corep_ca1 import CA1_FIELD_LABELS, OwnFundsSchema
+from template.render import iter_template_extract_html
+from export.layouts import get_layout
+from export.xbrl_csv import ExportItem
+
+TSV_HEADER = ("field_id", "field_label", "value")
+TSV_ENTITY_HEADER = ("entity_id", "reference_date", "template_id") + TSV_HEADER
+
+
+def _tsv_cell(value: str) -> str:
+    return value.replace("\t", " ").replace("\n", " ")
+
+
+def iter_tsv_rows(schema: OwnFundsSchema, template_id: str = "") -> Iterator[tuple[str, str, str]]:
+    """(field_id, field_label, value) in template row order, then any extra fields."""
+    layout = get_layout(template_id or schema.template_id)
+    values = {f.field_id: f.value for f in schema.fields}
+    for row in layout.rows:
+        yield row.field_id, row.label, values.get(row.field_id) or ""
+    for f in schema.fields:
+        if f.field_id not in layout.field_ids:
+            yield f.field_id, CA1_FIELD_LABELS.get(f.field_id, f.field_id), f.value or ""
+
+
+def write_tsv(items: Iterable[ExportItem], out: IO[str], include_entity: bool = True) -> None:
+    """Write one TSV over all items, row by row."""
+    out.write("\t".join(TSV_ENTITY_HEADER if include_entity else TSV_HEADER) + "\n")
+    for item in items:
+        prefix = (item.entity_id, item.reference_date, item.schema.template_id) if include_entity else ()
+        for row in iter_tsv_rows(item.schema, item.template_id):
+            out.write("\t".join(_tsv_cell(c) for c in prefix + row) + "\n")
+
+
+def write_html(items: Iterable[ExportItem], out: IO[str]) -> None:
+    """Write one HTML document with a template extract section per item."""
+    out.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>COREP export</title></head><body>\n')
+    for item in items:
+        out.write(f"<h2>{item.entity_id} – {item.reference_date}</h2>\n")
+        for part in iter_template_extract_html(item.schema):
+            out.write(part)
+        out.write("\n")
+    out.write("</body></html>\n")
@@ -0,0 +1,253 @@
+"""
+Streaming XBRL-CSV export of populated templates.
+
+One report package (zip) is written per (entity, reference date). Table CSVs are streamed into
+the archive as each template arrives, so only the current template is ever held in memory.
+Items must be grouped by entity and reference date (e.g. in the order batch runs produced them).
+
+Usage:
+    python -m export.xbrl_csv results.jsonl --out exports/
+    python -m export.xbrl_csv --job <job id> --out exports/
+where each JSONL line is {"entity_id", "reference_date", "schema": {...}} (a pipeline result with
+those two keys added also works); --job reads a batch job's results from the job queue.
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import re
+import zipfile
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import IO, Iterable, Iterator
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import EXPORT_DIR, XBRL_BASE_CURRENCY, XBRL_ENTRY_POINT
+from schemas.corep_ca1 import OwnFundsSchema
+from template.validation import parse_number
+from export.layouts import get_layout
+
+REPORT_PACKAGE_TYPE = "https://xbrl.org/report-package/2023"
+XBRL_CSV_TYPE = "https://xbrl.org/2021/xbrl-csv"
+
+
+@dataclass
+class ExportItem:
+    """
+    One populated template for one entity and reference date. template_id (the template that was
+    requested) takes precedence over the LLM-returned schema.template_id when choosing the layout.
+    """
+    entity_id: str
+    reference_date: str
+    schema: OwnFundsSchema
+    template_id: str = ""
+
+
+def _fact_value(field_id: str, value: str) -> str:
+    # Monetary facts are reported in units (decimalsMonetary=0): "1,200,000" -> 1200000
+    number = parse_number(value)
+    if number is None:
+        raise ValueError(f"{field_id}: {value!r} is not a numeric amount")
+    if isinstance(number, float):
+        return format(Decimal(repr(number)).normalize(), "f")
+    return str(number)
+
+
+def iter_table_lines(schema: OwnFundsSchema, template_id: str = "") -> Iterator[str]:
+    """
+    XBRL-CSV table lines (header, then datapoint,factValue per reported row) for one template.
+    Raises ValueError for a reported value that is not a number.
+    """
+    layout = get_layout(template_id or schema.template_id)
+    values = {f.field_id: f.value for f in schema.fields}
+    yield "datapoint,factValue\n"
+    for row in layout.rows:
+        value = values.get(row.field_id)
+        if value is not None and str(value).strip() != "":
+            yield row.csv_prefix + _fact_value(row.field_id, str(value).strip()) + "\n"
+
+
+class ReportPackageWriter:
+    """Writes one XBRL-CSV report package; add() streams a table file per template."""
+
+    def __init__(
+        self,
+        target: "str | Path | IO[bytes]",
+        entity_id: str,
+        reference_date: str,
+        base_currency: str = XBRL_BASE_CURRENCY,
+        entry_point: str = XBRL_ENTRY_POINT,
+    ):
+        try:
+            date.fromisoformat(reference_date)
+        except (TypeError, ValueError):
+            raise ValueError(f"Reference date must be YYYY-MM-DD, got {reference_date!r}")
+        self.entity_id = entity_id
+        self.reference_date = reference_date
+        self.base_currency = base_currency
+        self.entry_point = entry_point
+        self.root = package_name(entity_id, reference_date)
+        self._zip = zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED)
+        self._indicators: list[str] = []
+
+    def __enter__(self) -> "ReportPackageWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def add(self, schema: OwnFundsSchema, template_id: str = "") -> None:
+        layout = get_layout(template_id or schema.template_id)
+        if layout.filing_indicator in self._indicators:
+            raise ValueError(f"{self.root}: template {layout.template_id} already written")
+        # Render fully before opening the entry, so a rejected value leaves no partial table behind
+        lines = list(iter_table_lines(schema, layout.template_id))
+        with self._zip.open(f"{self.root}/reports/{layout.table_file}", "w", force_zip64=True) as raw:
+            with io.TextIOWrapper(raw, encoding="utf-8", newline="") as out:
+                out.writelines(lines)
+        self._indicators.append(layout.filing_indicator)
+
+    def close(self) -> None:
+        if self._zip.fp is None:
+            return
+        self._write_text("META-INF/reportPackage.json", json.dumps(
+            {"documentInfo": {"documentType": REPORT_PACKAGE_TYPE}}, indent=2))
+        self._write_text("reports/report.json", json.dumps(
+            {"documentInfo": {"documentType": XBRL_CSV_TYPE, "extends": [self.entry_point]}}, indent=2))
+        self._write_rows("reports/parameters.csv", [
+            ("name", "value"),
+            ("entityID", f"lei:{self.entity_id}"),
+            ("refPeriod", self.reference_date),
+            ("baseCurrency", f"iso4217:{self.base_currency}"),
+            ("decimalsInteger", "0"),
+            ("decimalsMonetary", "0"),
+        ])
+        self._write_rows("reports/FilingIndicators.csv",
+                         [("templateID", "reported")] + [(i, "true") for i in self._indicators])
+        self._zip.close()
+
+    def _write_text(self, name: str, text: str) -> None:
+        self._zip.writestr(f"{self.root}/{name}", text)
+
+    def _write_rows(self, name: str, rows: list[tuple[str, str]]) -> None:
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator="\n").writerows(rows)
+        self._write_text(name, buf.getvalue())
+
+
+def package_name(entity_id: str, reference_date: str) -> str:
+    safe_entity = re.sub(r"[^A-Za-z0-9_-]", "_", entity_id)
+    return f"{safe_entity}_COREP_{reference_date.replace('-', '')}"
+
+
+def export_packages(items: Iterable[ExportItem], out_dir: Path = EXPORT_DIR) -> Iterator[Path]:
+    """
+    Stream items into one report package per consecutive (entity_id, reference_date) group.
+    Yields each package path as soon as it is complete.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    seen: set[tuple[str, str]] = set()
+    for key, group in itertools.groupby(items, key=lambda i: (i.entity_id, i.reference_date)):
+        if key in seen:
+            raise ValueError(f"Items for {key} are not contiguous; group them by entity and reference date")
+        seen.add(key)
+        path = out_dir / f"{package_name(*key)}.zip"
+        try:
+            with ReportPackageWriter(path, *key) as writer:
+                for item in group:
+                    writer.add(item.schema, item.template_id)
+        except Exception:
+            # Never leave an incomplete filing behind
+            path.unlink(missing_ok=True)
+            raise
+        yield path
+
+
+def _item_from_result(data: dict, entity_id: str = "", template_id: str = "") -> ExportItem | None:
+    # Results without a schema (e.g. no rules retrieved) or entity have nothing to file
+    if not data.get("schema"):
+        return None
+    entity_id = data.get("entity_id") or entity_id
+    if not entity_id:
+        return None
+    schema = OwnFundsSchema.model_validate(data["schema"])
+    return ExportItem(
+        entity_id=entity_id,
+        reference_date=data.get("reference_date") or schema.reference_date or "",
+        schema=schema,
+        template_id=data.get("template_id") or template_id,
+    )
+
+
+def _skip_reason(data: dict) -> str:
+    return "no schema" if not data.get("schema") else "no entity_id"
+
+
+def iter_items_from_jsonl(path: Path, skipped: list[str] | None = None) -> Iterator[ExportItem]:
+    """
+    Read ExportItems lazily from a JSONL file of results (one line in memory at a time).
+    Lines without a schema or entity_id are skipped and described in `skipped`, if given.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            item = _item_from_result(data)
+            if item is None:
+                if skipped is not None:
+                    skipped.append(f"line {n}: {_skip_reason(data)}")
+                continue
+            yield item
+
+
+def iter_items_from_job(job_id: str, queue=None, skipped: list[str] | None = None) -> Iterator[ExportItem]:
+    """
+    Read ExportItems lazily from a finished batch job's results (one result row at a time).
+    entity_id and template_id come from the result or, failing that, the job's task. Results
+    without a schema or entity_id are skipped and described in `skipped`, if given.
+    """
+    from jobs.store import QUEUED, RUNNING, JobQueue
+
+    queue = queue or JobQueue()
+    job = queue.get(job_id, include_results=False)
+    if job is None:
+        raise ValueError(f"Unknown job: {job_id}")
+    if job["status"] in (QUEUED, RUNNING):
+        raise ValueError(f"Job {job_id} is {job['status']}; export it once it has finished")
+    for idx, task, result in queue.iter_results(job_id):
+        item = _item_from_result(result, task.get("entity_id", ""), task.get("template_id", ""))
+        if item is None:
+            if skipped is not None:
+                skipped.append(f"task {idx}: {_skip_reason(result)}")
+            continue
+        yield item
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Export populated templates as XBRL-CSV report packages.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("results", type=Path, nargs="?", help="JSONL with entity_id, reference_date and schema per line")
+    source.add_argument("--job", help="Export the results of a finished batch job (POST /api/jobs) instead")
+    parser.add_argument("--out", type=Path, default=EXPORT_DIR)
+    args = parser.parse_args(argv)
+    skipped: list[str] = []
+    if args.job:
+        items = iter_items_from_job(args.job, skipped=skipped)
+    else:
+        items = iter_items_from_jsonl(args.results, skipped=skipped)
+    n = 0
+    for path in export_packages(items, args.out):
+        n += 1
+        print(path)
+    print(f"Wrote {n} report package(s) to {args.out}")
+    for reason in skipped:
+        print(f"Skipped {reason}")
+
+
+if __name__ == "__main__":
+    main()
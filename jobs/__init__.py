@@ -0,0 +1,5 @@
+"""Background jobs: persistent queue and local worker pool for population runs."""
+from .store import JobQueue, get_job_queue
+from .worker import WorkerPool, run_job
+
+__all__ = ["JobQueue", "get_job_queue", "WorkerPool", "run_job"]
@@ -0,0 +1,266 @@
+"""
+Persistent local job queue (SQLite, no external broker) for long-running population runs.
+
+A job is a list of pipeline tasks ({question, scenario, template_id, ...}). Workers claim jobs
+by priority under a lease, record each task's result as it completes (partial results survive
+retries), and failed attempts are re-queued with backoff up to max_attempts.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Iterator
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import JOBS_DB_PATH, JOBS_MAX_ATTEMPTS, JOBS_LEASE_S
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    idempotency_key TEXT UNIQUE,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, created_at);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    result TEXT,
+    PRIMARY KEY (job_id, idx)
+) WITHOUT ROWID;
+"""
+
+
+class JobQueue:
+    """SQLite-backed queue; safe to share the database file between processes."""
+
+    def __init__(self, path: Path = JOBS_DB_PATH):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def _row_to_job(self, row: sqlite3.Row | tuple) -> dict:
+        cols = ("id", "idempotency_key", "status", "priority", "attempts", "max_attempts", "payload",
+                "total", "done", "error", "worker", "created_at", "updated_at", "available_at", "lease_until")
+        job = dict(zip(cols, row))
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def enqueue(
+        self,
+        tasks: list[dict],
+        priority: int = 0,
+        idempotency_key: str | None = None,
+        max_attempts: int = JOBS_MAX_ATTEMPTS,
+    ) -> tuple[dict, bool]:
+        """
+        Add a job. Returns (job, created); with an idempotency_key that was already used,
+        returns the existing job and created=False.
+        """
+        if not tasks:
+            raise ValueError("Job has no tasks")
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (id, idempotency_key, status, priority, max_attempts, payload, total,"
+                    " created_at, updated_at, available_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, idempotency_key, QUEUED, priority, max_attempts, json.dumps({"tasks": tasks}),
+                     len(tasks), now, now, now),
+                )
+                created = True
+            except sqlite3.IntegrityError:
+                job_id = self._conn.execute(
+                    "SELECT id FROM jobs WHERE idempotency_key = ?", (idempotency_key,)
+                ).fetchone()[0]
+                created = False
+        return self.get(job_id, include_results=False), created
+
+    def claim(self, worker: str, lease_s: float = JOBS_LEASE_S) -> dict | None:
+        """
+        Take the highest-priority runnable job (queued, or running with an expired lease).
+        A job whose lease expired on its last allowed attempt (e.g. its worker was killed) is marked failed.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, worker = NULL, lease_until = NULL, updated_at = ?"
+                    " WHERE status = ? AND lease_until < ? AND attempts >= max_attempts",
+                    (FAILED, "Lease expired on the last attempt (worker lost)", now, RUNNING, now),
+                )
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?)"
+                    " ORDER BY priority DESC, created_at LIMIT 1",
+                    (QUEUED, now, RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                job = self._row_to_job(row)
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, lease_until = ?, updated_at = ?"
+                    " WHERE id = ?",
+                    (RUNNING, worker, now + lease_s, now, job["id"]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        job.update(status=RUNNING, attempts=job["attempts"] + 1, worker=worker)
+        return job
+
+    # The calls below only act while `worker` still holds the job: after its lease expired and another
+    # worker re-claimed it, they return False (None for fail) and change nothing.
+
+    def heartbeat(self, job_id: str, worker: str, lease_s: float = JOBS_LEASE_S) -> bool:
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND status = ? AND worker = ?",
+                (now + lease_s, now, job_id, RUNNING, worker),
+            )
+        return cur.rowcount == 1
+
+    def record_result(self, job_id: str, worker: str, idx: int, result: dict) -> bool:
+        """Store one task's result and advance progress."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self._conn.execute(
+                    "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = ? AND worker = ?",
+                    (time.time(), job_id, RUNNING, worker),
+                )
+                if cur.rowcount != 1:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.execute("INSERT OR REPLACE INTO job_results VALUES (?, ?, ?)", (job_id, idx, json.dumps(result)))
+                self._conn.execute(
+                    "UPDATE jobs SET done = (SELECT COUNT(*) FROM job_results WHERE job_id = ?) WHERE id = ?",
+                    (job_id, job_id),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def completed_indices(self, job_id: str) -> set[int]:
+        with self._lock:
+            return {r[0] for r in self._conn.execute("SELECT idx FROM job_results WHERE job_id = ?", (job_id,))}
+
+    def complete(self, job_id: str, worker: str) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = NULL, lease_until = NULL, updated_at = ?"
+                " WHERE id = ? AND status = ? AND worker = ?",
+                (SUCCEEDED, time.time(), job_id, RUNNING, worker),
+            )
+        return cur.rowcount == 1
+
+    def fail(self, job_id: str, worker: str, error: str) -> str | None:
+        """Record a failed attempt: re-queue with exponential backoff, or mark failed. Returns new status."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = ? AND worker = ?",
+                (job_id, RUNNING, worker),
+            ).fetchone()
+            if row is None:
+                return None
+            attempts, max_attempts = row
+            status = QUEUED if attempts < max_attempts else FAILED
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, available_at = ?, updated_at = ?"
+                " WHERE id = ? AND status = ? AND worker = ?",
+                (status, error, now + 2 ** attempts, now, job_id, RUNNING, worker),
+            )
+        return status
+
+    def get(self, job_id: str, include_results: bool = True) -> dict | None:
+        """Job status with progress and (optionally) the results recorded so far, in task order."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            results = self._conn.execute(
+                "SELECT idx, result FROM job_results WHERE job_id = ? ORDER BY idx", (job_id,)
+            ).fetchall() if include_results else []
+        job = self._row_to_job(row)
+        out = {
+            "id": job["id"],
+            "status": job["status"],
+            "priority": job["priority"],
+            "attempts": job["attempts"],
+            "max_attempts": job["max_attempts"],
+            "idempotency_key": job["idempotency_key"],
+            "progress": {"done": job["done"], "total": job["total"]},
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+        }
+        if include_results:
+            out["results"] = [{"index": idx, **json.loads(r)} for idx, r in results]
+        return out
+
+
+    def iter_results(self, job_id: str) -> Iterator[tuple[int, dict, dict]]:
+        """
+        Yield (index, task, result) for the job's recorded results in task order, reading one row
+        at a time (for exporting large jobs without loading every result).
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return
+        tasks = json.loads(row[0])["tasks"]
+        idx = -1
+        while True:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT idx, result FROM job_results WHERE job_id = ? AND idx > ? ORDER BY idx LIMIT 1",
+                    (job_id, idx),
+                ).fetchone()
+            if row is None:
+                return
+            idx = row[0]
+            yield idx, tasks[idx], json.loads(row[1])
+
+
+_queue: JobQueue | None = None
+_queue_pid: int | None = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide queue handle (re-opened after fork; SQLite connections must not be shared)."""
+    global _queue, _queue_pid
+    if _queue is None or _queue_pid != os.getpid():
+        with _queue_lock:
+            if _queue is None or _queue_pid != os.getpid():
+                _queue = JobQueue()
+                _queue_pid = os.getpid()
+    return _queue
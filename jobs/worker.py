@@ -0,0 +1,119 @@
+"""
+Local worker pool for queued population runs. Each worker process loads the retriever once and
+keeps it warm, then claims jobs from the SQLite queue until stopped.
+
+Usage:
+    python -m jobs.worker --workers 4
+"""
+import argparse
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import JOBS_WORKERS, JOBS_POLL_INTERVAL_S
+
+
+def run_job(jq, job: dict) -> bool:
+    """
+    Run the job's remaining tasks, recording each result as it completes.
+    Returns False if the job was re-claimed by another worker meanwhile (its lease expired).
+    """
+    from service.pipeline import run_pipeline
+
+    done = jq.completed_indices(job["id"])
+    for idx, task in enumerate(job["payload"]["tasks"]):
+        if idx in done:
+            continue
+        result = run_pipeline(
+            question=task["question"],
+            scenario=task.get("scenario", ""),
+            template_id=task.get("template_id", "C 01.00"),
+        )
+        if task.get("entity_id"):
+            result["entity_id"] = task["entity_id"]
+        if not jq.record_result(job["id"], job["worker"], idx, result):
+            return False
+        jq.heartbeat(job["id"], job["worker"])
+    return True
+
+
+def _worker_main(worker_id: str, stop: "mp.Event", poll_interval_s: float) -> None:
+    from jobs.store import JobQueue
+    from service.pipeline import get_retriever
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    parent = os.getppid()
+    jq = JobQueue()
+    try:
+        get_retriever()
+    except FileNotFoundError as e:
+        print(f"[{worker_id}] retriever not ready: {e}", flush=True)
+    # Exit with the process that started the pool, even if it died without calling stop()
+    while not stop.is_set() and os.getppid() == parent:
+        job = jq.claim(worker_id)
+        if job is None:
+            stop.wait(poll_interval_s)
+            continue
+        try:
+            owned = run_job(jq, job)
+        except Exception as e:
+            jq.fail(job["id"], worker_id, f"{type(e).__name__}: {e}")
+        else:
+            if owned:
+                jq.complete(job["id"], worker_id)
+
+
+class WorkerPool:
+    """N worker processes (spawned, so each starts clean and loads its own warm retriever)."""
+
+    def __init__(self, workers: int = JOBS_WORKERS, poll_interval_s: float = JOBS_POLL_INTERVAL_S):
+        self.workers = workers
+        self.poll_interval_s = poll_interval_s
+        self._ctx = mp.get_context("spawn")
+        self._stop = self._ctx.Event()
+        self._procs: list = []
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            p = self._ctx.Process(
+                target=_worker_main,
+                args=(f"{os.getpid()}-w{i}", self._stop, self.poll_interval_s),
+                name=f"job-worker-{i}",
+                daemon=True,
+            )
+            p.start()
+            self._procs.append(p)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Signal workers to stop after their current job (interrupted jobs are re-claimed after the lease)."""
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for p in self._procs:
+            p.join(max(0.0, deadline - time.monotonic()))
+            if p.is_alive():
+                p.terminate()
+        self._procs = []
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run queued population jobs with a local worker pool.")
+    parser.add_argument("--workers", type=int, default=max(JOBS_WORKERS, 1))
+    args = parser.parse_args(argv)
+    pool = WorkerPool(args.workers)
+    pool.start()
+    print(f"Job workers started: {args.workers}")
+    stopped = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    while not stopped.wait(1.0):
+        pass
+    pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Micro-batching query encoder: concurrent encode() calls are collected for up to max_wait_ms or
+max_batch_size texts and run as one batched forward pass, each caller getting its own slice back.
+A lone caller is encoded immediately; the wait only applies while other calls are in flight.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import (
+    EMBED_BATCH_MAX_SIZE,
+    EMBED_BATCH_MAX_WAIT_MS,
+    TORCH_NUM_THREADS,
+    TORCH_INTEROP_THREADS,
+)
+
+
+def drain_batch(
+    get: Callable[[float], object],
+    first,
+    max_batch_size: int,
+    max_wait_ms: float,
+    size_of: Callable[[object], int],
+    more_expected: Callable[[int], bool] | None = None,
+) -> tuple[list, bool]:
+    """
+    Collect items after `first` until the batch holds max_batch_size texts or max_wait_ms elapses.
+    get(timeout) must raise queue.Empty on timeout. A None item is the stop sentinel.
+    If more_expected(len(batch)) is given, the batch is closed as soon as nothing is queued and it
+    returns False, instead of waiting out max_wait_ms. Returns (batch, stop_requested).
+    """
+    batch = [first]
+    n = size_of(first)
+    deadline = time.monotonic() + max_wait_ms / 1000
+    while n < max_batch_size:
+        remaining = deadline - time.monotonic()
+        if more_expected is not None and remaining > 0:
+            try:
+                item = get(0)
+            except queue.Empty:
+                if not more_expected(len(batch)):
+                    break
+            else:
+                if item is None:
+                    return batch, True
+                batch.append(item)
+                n += size_of(item)
+                continue
+        try:
+            item = get(remaining) if remaining > 0 else get(0)
+        except queue.Empty:
+            break
+        if item is None:
+            return batch, True
+        batch.append(item)
+        n += size_of(item)
+    return batch, False
+
+
+def configure_torch_threads(intra_op: int = TORCH_NUM_THREADS, inter_op: int = TORCH_INTEROP_THREADS) -> None:
+    """Set torch intra-/inter-op thread counts (0 leaves the torch default)."""
+    if not intra_op and not inter_op:
+        return
+    import torch
+    if intra_op:
+        torch.set_num_threads(intra_op)
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError:
+            # Can only be set once, before any inter-op parallel work has started
+            pass
+
+
+class BatchingEncoder:
+    """
+    Wraps a model with encode(texts, show_progress_bar=False) and exposes the same call, batching
+    concurrent callers. The batching thread starts lazily in the process that first encodes,
+    so an instance built before fork works in every worker.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+        max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS,
+    ):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: queue.Queue | None = None
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        # Calls that entered encode() and have not been served yet
+        self._in_flight = 0
+
+    def _ensure_thread(self) -> queue.Queue:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    self._in_flight = 0
+                    threading.Thread(target=self._run, args=(self._queue,), daemon=True).start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def _run(self, q: queue.Queue) -> None:
+        while True:
+            first = q.get()
+            if first is None:
+                return
+            batch, stop = drain_batch(
+                lambda timeout: q.get(timeout=timeout) if timeout > 0 else q.get_nowait(),
+                first,
+                self.max_batch_size,
+                self.max_wait_ms,
+                lambda item: len(item[0]),
+                # Wait only for callers that are already in encode() but not yet in this batch
+                lambda batched: self._in_flight > batched,
+            )
+            texts = [t for item_texts, _ in batch for t in item_texts]
+            try:
+                embeddings = self.model.encode(texts, show_progress_bar=False)
+            except Exception as e:
+                self._served(len(batch))
+                for _, fut in batch:
+                    fut.set_exception(e)
+            else:
+                self._served(len(batch))
+                start = 0
+                for item_texts, fut in batch:
+                    fut.set_result(embeddings[start:start + len(item_texts)])
+                    start += len(item_texts)
+            if stop:
+                return
+
+    def _served(self, n: int) -> None:
+        with self._lock:
+            self._in_flight -= n
+
+    def encode(self, texts: list[str], show_progress_bar: bool = False):
+        fut: Future = Future()
+        q = self._ensure_thread()
+        with self._lock:
+            self._in_flight += 1
+        q.put((list(texts), fut))
+        return fut.result()
+
+    def close(self) -> None:
+        """Stop the batching thread of this process (pending requests are still served)."""
+        if self._pid == os.getpid() and self._queue is not None:
+            self._queue.put(None)
+            self._pid = None
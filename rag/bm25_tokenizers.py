@@ -0,0 +1,21 @@
+"""Tokenizers for the BM25 (sparse) index."""
+import re
+from typing import Callable
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+
+def tokenize_for_bm25(text: str) -> list[str]:
+    """Simple tokenizer: lowercase, split on non-alphanumeric."""
+    return [t.lower() for t in text.replace("\n", " ").split() if t.isalnum() or len(t) > 1]
+
+
+def tokenize_words(text: str) -> list[str]:
+    """Regex tokenizer: lowercase words, keeping dotted codes (e.g. 01.00) and hyphenated ids together."""
+    return _WORD_RE.findall(text.lower())
+
+
+TOKENIZERS: dict[str, Callable[[str], list[str]]] = {
+    "default": tokenize_for_bm25,
+    "words": tokenize_words,
+}
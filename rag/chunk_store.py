@@ -0,0 +1,140 @@
+"""
+Compact chunk store: per-chunk metadata in __slots__ records, all chunk texts in one UTF-8 blob
+(memory-mapped from disk) addressed by an offset table. Text is decoded only when a chunk is
+actually returned (prompt context or audit excerpt).
+"""
+import json
+import mmap
+import os
+import sys
+from pathlib import Path
+
+META_FIELDS = ("chunk_id", "source_id", "source_ref", "source_url", "template_ref")
+
+
+class ChunkRecord:
+    """Metadata for one chunk plus the location of its text in the blob."""
+    __slots__ = ("chunk_id", "source_id", "source_ref", "source_url", "template_ref", "offset", "length")
+
+    def __init__(self, chunk_id, source_id, source_ref, source_url, template_ref, offset, length):
+        self.chunk_id = chunk_id
+        self.source_id = source_id
+        self.source_ref = source_ref
+        self.source_url = source_url
+        self.template_ref = template_ref
+        self.offset = offset
+        self.length = length
+
+
+def _replace_file(path: Path, data: bytes) -> None:
+    # New inode + rename: processes that have the old file memory-mapped keep reading the old copy
+    # instead of faulting (SIGBUS) on a truncated mapping
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _intern(value: str | None) -> str | None:
+    # source_id / source_ref / source_url repeat across many chunks: keep one string object each
+    return sys.intern(value) if value else value
+
+
+class ChunkStore:
+    """Read-only chunk lookup by chunk_id, in corpus order."""
+
+    def __init__(self, records: list[ChunkRecord], blob):
+        self._records = records
+        self._blob = blob
+        self._index = {r.chunk_id: i for i, r in enumerate(records)}
+        self.ids = [r.chunk_id for r in records]
+
+    @staticmethod
+    def _build(chunks: list[dict]) -> tuple[list[ChunkRecord], bytes]:
+        records, parts, offset = [], [], 0
+        for c in chunks:
+            data = c["text"].encode("utf-8")
+            records.append(ChunkRecord(
+                c["chunk_id"],
+                _intern(c.get("source_id", "")),
+                _intern(c.get("source_ref", "")),
+                _intern(c.get("source_url", "")),
+                _intern(c.get("template_ref")),
+                offset,
+                len(data),
+            ))
+            parts.append(data)
+            offset += len(data)
+        return records, b"".join(parts)
+
+    @classmethod
+    def from_chunks(cls, chunks: list[dict]) -> "ChunkStore":
+        """In-memory store (no files), e.g. for chunk lists that were not ingested."""
+        records, blob = cls._build(chunks)
+        return cls(records, blob)
+
+    @classmethod
+    def write(cls, chunks: list[dict], blob_path: Path, meta_path: Path) -> None:
+        """Persist texts as one blob and metadata + offsets as columnar JSON."""
+        records, blob = cls._build(chunks)
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        _replace_file(blob_path, blob)
+        columns = {name: [getattr(r, name) for r in records] for name in META_FIELDS + ("offset", "length")}
+        _replace_file(meta_path, json.dumps(columns, ensure_ascii=False).encode("utf-8"))
+
+    @classmethod
+    def open(cls, blob_path: Path, meta_path: Path) -> "ChunkStore":
+        """Open a persisted store; the text blob is memory-mapped read-only (shared across processes)."""
+        with open(meta_path, "r", encoding="utf-8") as f:
+            columns = json.load(f)
+        records = [
+            ChunkRecord(cid, _intern(sid), _intern(ref), _intern(url), _intern(tref), offset, length)
+            for cid, sid, ref, url, tref, offset, length in zip(
+                *(columns[name] for name in META_FIELDS + ("offset", "length"))
+            )
+        ]
+        with open(blob_path, "rb") as f:
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if blob_path.stat().st_size else b""
+        return cls(records, blob)
+
+    def _decode(self, r: ChunkRecord) -> str:
+        return bytes(self._blob[r.offset:r.offset + r.length]).decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._index
+
+    def meta(self, chunk_id: str) -> ChunkRecord | None:
+        i = self._index.get(chunk_id)
+        return self._records[i] if i is not None else None
+
+    def template_ref(self, chunk_id: str) -> str | None:
+        r = self.meta(chunk_id)
+        return r.template_ref if r else None
+
+    def text(self, chunk_id: str) -> str:
+        r = self.meta(chunk_id)
+        if r is None:
+            raise KeyError(chunk_id)
+        return self._decode(r)
+
+    def iter_texts(self):
+        """Decode texts one at a time in corpus order (e.g. to rebuild a BM25 index)."""
+        for r in self._records:
+            yield self._decode(r)
+
+    def get(self, chunk_id: str) -> dict | None:
+        """Full chunk dict (chunk_id, source_id, source_ref, source_url, template_ref, text) or None."""
+        r = self.meta(chunk_id)
+        if r is None:
+            return None
+        return {
+            "chunk_id": r.chunk_id,
+            "source_id": r.source_id,
+            "source_ref": r.source_ref,
+            "source_url": r.source_url,
+            "template_ref": r.template_ref,
+            "text": self._decode(r),
+        }
@@ -0,0 +1,54 @@
+"""Dense index over a memory-mapped embeddings matrix (drop-in for the Chroma collection query API)."""
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalise rows so that a dot product is cosine similarity."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class NumpyDenseIndex:
+    """
+    Exact cosine search over an (n_chunks, dim) float32 matrix. When loaded with mmap the matrix
+    lives in the OS page cache, so forked or separately started workers share one physical copy.
+    """
+
+    def __init__(self, ids: list[str], matrix: np.ndarray):
+        if len(ids) != matrix.shape[0]:
+            raise ValueError(f"Embeddings rows ({matrix.shape[0]}) do not match chunk ids ({len(ids)})")
+        self.ids = ids
+        self.matrix = matrix
+
+    @classmethod
+    def load(cls, path: Path, ids: list[str], mmap: bool = True) -> "NumpyDenseIndex":
+        if not path.exists():
+            raise FileNotFoundError(f"Run ingest first. Missing {path}")
+        matrix = np.load(path, mmap_mode="r" if mmap else None)
+        return cls(ids, matrix)
+
+    @staticmethod
+    def save(path: Path, embeddings) -> None:
+        """Write to a temp file and rename, so processes mapping the old file keep a valid copy."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npy")
+        np.save(tmp, normalize_rows(embeddings))
+        os.replace(tmp, path)
+
+    def query(self, query_embeddings, n_results: int = 10, include=None) -> dict:
+        """Same shape as chromadb Collection.query: {"ids": [[...]], "distances": [[...]]} per query."""
+        q = normalize_rows(np.atleast_2d(query_embeddings))
+        scores = q @ self.matrix.T
+        n = min(n_results, len(self.ids))
+        all_ids, all_distances = [], []
+        for row in scores:
+            top = np.argpartition(-row, n - 1)[:n] if n < len(row) else np.arange(len(row))
+            top = top[np.argsort(-row[top])]
+            all_ids.append([self.ids[i] for i in top])
+            all_distances.append([float(1 - row[i]) for i in top])
+        return {"ids": all_ids, "distances": all_distances}
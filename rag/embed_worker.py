@@ -0,0 +1,236 @@
+"""
+Central embedding process: one model instance encodes queries for all API workers, micro-batching
+requests that arrive within a few milliseconds of each other into one forward pass.
+
+Each worker process talks to it over its own Unix-socket connection (opened lazily per pid), so no
+lock is shared between workers: a worker that dies mid-request only closes its own connection, and
+its respawned replacement opens a fresh one.
+"""
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import secrets
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import EMBEDDING_MODEL, EMBED_BATCH_MAX_SIZE, EMBED_BATCH_MAX_WAIT_MS
+from rag.batching import drain_batch
+
+
+class _Peer:
+    """Server side of one client connection; replies are serialised by a lock."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._lock = threading.Lock()
+
+    def send(self, message) -> None:
+        try:
+            with self._lock:
+                self.conn.send(message)
+        except (OSError, EOFError):
+            # Client went away; its requests are simply dropped
+            pass
+
+
+def _read_requests(conn, inbox: queue.Queue) -> None:
+    peer = _Peer(conn)
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                inbox.put(None)
+                return
+            request_id, texts = message
+            inbox.put((peer, request_id, texts))
+    except (OSError, EOFError):
+        pass
+    finally:
+        conn.close()
+
+
+def _accept_loop(listener: Listener, inbox: queue.Queue) -> None:
+    while True:
+        try:
+            conn = listener.accept()
+        except (OSError, EOFError):
+            continue
+        threading.Thread(target=_read_requests, args=(conn, inbox), daemon=True).start()
+
+
+def _serve(
+    address: str,
+    authkey: bytes,
+    ready: "mp.Event",
+    model_name: str,
+    max_batch_size: int,
+    max_wait_ms: float,
+) -> None:
+    """Embedding process main loop. Requests are (request_id, texts); None stops the loop."""
+    from rag.encoders import load_embedding_model
+
+    listener = Listener(address, family="AF_UNIX", authkey=authkey)
+    ready.set()
+    inbox: queue.Queue = queue.Queue()
+    threading.Thread(target=_accept_loop, args=(listener, inbox), daemon=True).start()
+
+    model = load_embedding_model(model_name=model_name)
+    while True:
+        first = inbox.get()
+        if first is None:
+            return
+        batch, stop = drain_batch(
+            lambda timeout: inbox.get(timeout=timeout) if timeout > 0 else inbox.get_nowait(),
+            first,
+            max_batch_size,
+            max_wait_ms,
+            lambda item: len(item[2]),
+        )
+
+        texts = [t for _, _, item_texts in batch for t in item_texts]
+        try:
+            embeddings = model.encode(texts, show_progress_bar=False)
+            start = 0
+            for peer, request_id, item_texts in batch:
+                peer.send((request_id, embeddings[start:start + len(item_texts)], None))
+                start += len(item_texts)
+        except Exception as e:
+            for peer, request_id, _ in batch:
+                peer.send((request_id, None, repr(e)))
+        if stop:
+            return
+
+
+class RemoteEncoder:
+    """
+    Client for the embedding process with the SentenceTransformer.encode call shape, so it can be
+    passed to Retriever as embedding_model. Safe to call from many threads of one worker process.
+    """
+
+    def __init__(self, address: str, authkey: bytes):
+        self._address = address
+        self._authkey = authkey
+        self._conn = None
+        self._pending: dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._pid: int | None = None
+
+    def _ensure_connection(self):
+        # Connections and threads do not survive fork: connect lazily in the process that uses it
+        if self._pid == os.getpid():
+            return self._conn
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pending = {}
+                self._conn = Client(self._address, family="AF_UNIX", authkey=self._authkey)
+                threading.Thread(target=self._read_responses, args=(self._conn,), daemon=True).start()
+                self._pid = os.getpid()
+            return self._conn
+
+    def _read_responses(self, conn) -> None:
+        try:
+            while True:
+                request_id, embeddings, error = conn.recv()
+                with self._lock:
+                    fut = self._pending.pop(request_id, None)
+                if fut is None:
+                    continue
+                if error:
+                    fut.set_exception(RuntimeError(f"Embedding worker failed: {error}"))
+                else:
+                    fut.set_result(embeddings)
+        except (OSError, EOFError):
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                if self._conn is conn:
+                    # Reconnect on the next encode
+                    self._pid = None
+            for fut in pending.values():
+                fut.set_exception(RuntimeError("Embedding worker connection closed"))
+
+    def encode(self, texts: list[str], show_progress_bar: bool = False, timeout: float = 30.0):
+        conn = self._ensure_connection()
+        fut: Future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = fut
+        try:
+            try:
+                with self._send_lock:
+                    conn.send((request_id, list(texts)))
+            except OSError as e:
+                with self._lock:
+                    if self._conn is conn:
+                        # Embedding process is gone (e.g. being restarted): reconnect on the next encode
+                        self._pid = None
+                raise RuntimeError("Embedding worker connection closed") from e
+            return fut.result(timeout=timeout)
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+
+class EmbeddingWorker:
+    """Owns the embedding process and the Unix socket that API workers connect to."""
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+        max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS,
+    ):
+        self._ctx = mp.get_context("fork")
+        self._dir = tempfile.mkdtemp(prefix="embed-worker-")
+        self.address = os.path.join(self._dir, "embed.sock")
+        self._authkey = secrets.token_bytes(32)
+        self._ready = self._ctx.Event()
+        self._args = (self.address, self._authkey, self._ready, model_name, max_batch_size, max_wait_ms)
+        self._process = None
+
+    @property
+    def pid(self) -> int | None:
+        """pid of the running embedding process (None before start or once it is collected)."""
+        return self._process.pid if self._process is not None else None
+
+    def start(self, timeout: float = 30.0) -> None:
+        """Start the embedding process, or restart it on the same socket path after it exited."""
+        self._ready.clear()
+        try:
+            # A dead process leaves its socket file behind; clients reconnect to the new listener
+            os.unlink(self.address)
+        except FileNotFoundError:
+            pass
+        self._process = self._ctx.Process(target=_serve, args=self._args, name="embedding-worker", daemon=True)
+        self._process.start()
+        if not self._ready.wait(timeout):
+            raise RuntimeError("Embedding worker did not start listening")
+
+    def collected(self) -> None:
+        """Record that a supervisor reaped the process (os.wait); it is no longer polled or signalled."""
+        self._process = None
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._process is not None and self._process.is_alive():
+            try:
+                with Client(self.address, family="AF_UNIX", authkey=self._authkey) as conn:
+                    conn.send(None)
+            except OSError:
+                pass
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._process = None
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def client(self) -> RemoteEncoder:
+        """Encoder handle; pass it to workers before or after fork (each process connects on first use)."""
+        return RemoteEncoder(self.address, self._authkey)
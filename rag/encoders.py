@@ -0,0 +1,30 @@
+"""Embedding model backends selected by EMBEDDING_BACKEND in config.py."""
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import EMBEDDING_MODEL, EMBEDDING_BACKEND, TORCH_NUM_THREADS
+
+BACKENDS = ("torch", "onnx")
+
+
+def load_embedding_model(
+    backend: str = EMBEDDING_BACKEND,
+    model_name: str = EMBEDDING_MODEL,
+    num_threads: int = TORCH_NUM_THREADS,
+):
+    """
+    Return an encoder with encode(texts, show_progress_bar=False), using num_threads intra-op
+    threads (0 = the runtime default, all cores).
+    "torch": SentenceTransformer (reference path used to build the index).
+    "onnx": the ONNX/int8 export of model_name via onnxruntime, for query encoding; torch is never imported.
+    """
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        from rag.batching import configure_torch_threads
+        configure_torch_threads(num_threads)
+        return SentenceTransformer(model_name)
+    if backend == "onnx":
+        from rag.onnx_encoder import OnnxEncoder
+        return OnnxEncoder.load(num_threads=num_threads, model_name=model_name)
+    raise ValueError(f"Unknown embedding backend: {backend} (expected one of {BACKENDS})")
@@ -1,6 +1,7 @@
 """Ingest curated corpus into BM25 and vector indices."""
 import json
 import pickle
+from datetime import date
 from pathlib import Path
 
 from rank_bm25 import BM25Okapi
@@ -12,10 +13,16 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from config import (
     CORPUS_DIR,
     CHUNKS_JSON_PATH,
+    CHUNK_TEXTS_PATH,
+    CHUNK_META_PATH,
     BM25_INDEX_PATH,
     CHROMA_PERSIST_DIR,
-    EMBEDDING_MODEL,
+    EMBEDDINGS_NPY_PATH,
 )
+from rag.chunk_store import ChunkStore
+from rag.dense import NumpyDenseIndex
+from rag.encoders import load_embedding_model
+from rag.bm25_tokenizers import tokenize_for_bm25
 
 
 def load_corpus() -> list[dict]:
@@ -27,14 +34,12 @@ def load_corpus() -> list[dict]:
         return json.load(f)
 
 
-def tokenize_for_bm25(text: str) -> list[str]:
-    """Simple tokenizer: lowercase, split on non-alphanumeric."""
-    return [t.lower() for t in text.replace("\n", " ").split() if t.isalnum() or len(t) > 1]
-
-
-def ingest_corpus() -> list[dict]:
+def ingest_corpus(effective_from: str | None = None) -> list[dict]:
     """
     Load corpus, build BM25 index and Chroma collection, persist chunks and indices.
+    If effective_from (YYYY-MM-DD) is given, also publish the corpus as a versioned snapshot. Once
+    snapshots are in use (serving routes to them), the corpus is always published, effective from
+    today unless effective_from says otherwise, so re-ingesting takes effect.
     Returns list of chunk dicts with chunk_id, source_id, source_ref, source_url, template_ref, text.
     """
     chunks = load_corpus()
@@ -45,18 +50,22 @@ def ingest_corpus() -> list[dict]:
     CHUNKS_JSON_PATH.parent.mkdir(parents=True, exist_ok=True)
     with open(CHUNKS_JSON_PATH, "w", encoding="utf-8") as f:
         json.dump(chunks, f, indent=2, ensure_ascii=False)
+    ChunkStore.write(chunks, CHUNK_TEXTS_PATH, CHUNK_META_PATH)
 
     # BM25: tokenized corpus
     tokenized = [tokenize_for_bm25(c["text"]) for c in chunks]
     bm25 = BM25Okapi(tokenized)
     with open(BM25_INDEX_PATH, "wb") as f:
-        pickle.dump({"bm25": bm25, "chunks": chunks}, f)
+        pickle.dump({"bm25": bm25, "chunk_ids": [c["chunk_id"] for c in chunks]}, f)
 
     # Chroma: embeddings
-    from sentence_transformers import SentenceTransformer
-    model = SentenceTransformer(EMBEDDING_MODEL)
+    # The index is always built with the torch reference model; other backends only encode queries
+    model = load_embedding_model("torch")
     texts = [c["text"] for c in chunks]
-    embeddings = model.encode(texts, show_progress_bar=False).tolist()
+    embeddings_arr = model.encode(texts, show_progress_bar=False)
+    # Same vectors as a flat matrix (chunks.json order) for memory-mapped serving
+    NumpyDenseIndex.save(EMBEDDINGS_NPY_PATH, embeddings_arr)
+    embeddings = embeddings_arr.tolist()
     ids = [c["chunk_id"] for c in chunks]
 
     client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR, settings=Settings(anonymized_telemetry=False))
@@ -73,6 +82,11 @@ def ingest_corpus() -> list[dict]:
         "template_ref": c.get("template_ref") or "",
     } for c in chunks])
 
+    from rag.snapshots import SnapshotStore
+    snapshots = SnapshotStore()
+    if effective_from or snapshots.registry_path.exists():
+        snapshots.publish(chunks, effective_from or date.today().isoformat(), embedding_model=model)
+
     return chunks
 
 
@@ -0,0 +1,206 @@
+"""
+CPU-optimised embedding backend: the sentence-transformers model exported to ONNX (optionally
+int8-quantised) and run with onnxruntime and a fast tokenizer, without importing torch.
+
+Export (needs torch, sentence-transformers, onnx and onnxruntime once):
+    python -m rag.onnx_encoder export [--no-quantize]
+"""
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import (
+    EMBEDDING_MODEL,
+    ONNX_MODEL_DIR,
+    ONNX_QUANTIZE,
+    ONNX_MIN_COSINE,
+    TORCH_NUM_THREADS,
+)
+
+ONNX_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+META_FILE = "encoder.json"
+
+
+def onnx_model_dir(model_name: str = EMBEDDING_MODEL) -> Path:
+    """Export directory for model_name (ONNX_MODEL_DIR for the configured EMBEDDING_MODEL)."""
+    return ONNX_MODEL_DIR.parent / model_name.replace("/", "__")
+
+
+class OnnxEncoder:
+    """Mean-pooled (and optionally L2-normalised) sentence embeddings from an exported ONNX model."""
+
+    def __init__(self, session, tokenizer, normalize: bool = True, batch_size: int = 32):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.normalize = normalize
+        self.batch_size = batch_size
+        self._input_names = {i.name for i in session.get_inputs()}
+
+    @classmethod
+    def load(
+        cls,
+        model_dir: Path | None = None,
+        num_threads: int = TORCH_NUM_THREADS,
+        model_name: str = EMBEDDING_MODEL,
+    ) -> "OnnxEncoder":
+        """Load the export of model_name; raises ValueError if model_dir holds a different model."""
+        model_dir = model_dir or onnx_model_dir(model_name)
+        meta_path = model_dir / META_FILE
+        if not meta_path.exists():
+            raise FileNotFoundError(
+                f"ONNX encoder not exported. Missing {meta_path} (run: python -m rag.onnx_encoder export --model {model_name})"
+            )
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model_name") != model_name:
+            raise ValueError(
+                f"ONNX export in {model_dir} is for {meta.get('model_name')!r}, not {model_name!r}; re-export it"
+            )
+
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            opts.intra_op_num_threads = num_threads
+        session = ort.InferenceSession(str(model_dir / meta["model_file"]), opts, providers=["CPUExecutionProvider"])
+
+        tokenizer = Tokenizer.from_file(str(model_dir / TOKENIZER_FILE))
+        tokenizer.enable_truncation(max_length=meta["max_seq_length"])
+        tokenizer.enable_padding(pad_id=meta.get("pad_id", 0), pad_token=meta.get("pad_token", "[PAD]"))
+        return cls(session, tokenizer, normalize=meta.get("normalize", True))
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        last_hidden = self.session.run(None, feeds)[0]
+
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (last_hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def encode(self, texts: list[str], show_progress_bar: bool = False) -> np.ndarray:
+        """Same call shape as SentenceTransformer.encode; returns an (n, dim) float32 array."""
+        if not texts:
+            return np.zeros((0, self.session.get_outputs()[0].shape[-1] or 0), dtype=np.float32)
+        parts = [self._encode_batch(texts[i:i + self.batch_size]) for i in range(0, len(texts), self.batch_size)]
+        return np.concatenate(parts, axis=0)
+
+
+def check_compatibility(reference, candidate, texts: list[str], min_cosine: float = ONNX_MIN_COSINE) -> float:
+    """
+    Encode `texts` with both models and return the lowest per-text cosine similarity.
+    Raises ValueError when it is below min_cosine (candidate would not match the existing index).
+    """
+    ref = np.asarray(reference.encode(texts, show_progress_bar=False), dtype=np.float32)
+    cand = np.asarray(candidate.encode(texts, show_progress_bar=False), dtype=np.float32)
+    if ref.shape != cand.shape:
+        raise ValueError(f"Embedding shape mismatch: reference {ref.shape}, candidate {cand.shape}")
+    ref /= np.clip(np.linalg.norm(ref, axis=1, keepdims=True), 1e-12, None)
+    cand /= np.clip(np.linalg.norm(cand, axis=1, keepdims=True), 1e-12, None)
+    worst = float((ref * cand).sum(axis=1).min())
+    if worst < min_cosine:
+        raise ValueError(f"ONNX embeddings diverge from the torch model: min cosine {worst:.4f} < {min_cosine}")
+    return worst
+
+
+def export_onnx(
+    model_name: str = EMBEDDING_MODEL,
+    out_dir: Path | None = None,
+    quantize: bool = ONNX_QUANTIZE,
+    check_texts: list[str] | None = None,
+) -> Path:
+    """
+    Export the transformer of a mean-pooling sentence-transformers model to ONNX, optionally
+    quantise weights to int8, save the fast tokenizer, and check the result against the torch model.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    model = SentenceTransformer(model_name, device="cpu")
+    pooling = next((m for m in model if isinstance(m, Pooling)), None)
+    if pooling is None or not pooling.pooling_mode_mean_tokens:
+        raise ValueError(f"{model_name}: only mean-pooling models can be exported")
+    normalize = any(isinstance(m, Normalize) for m in model)
+    out_dir = out_dir or onnx_model_dir(model_name)
+    transformer = model[0].auto_model.eval()
+    hf_tokenizer = model.tokenizer
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sample = hf_tokenizer(["export sample"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic = {n: {0: "batch", 1: "seq"} for n in input_names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "seq"}
+
+    class _Wrapper(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *args):
+            return self.inner(**dict(zip(input_names, args))).last_hidden_state
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _Wrapper(transformer),
+            tuple(sample[n] for n in input_names),
+            str(out_dir / ONNX_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=14,
+        )
+
+    model_file = ONNX_FILE
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(out_dir / ONNX_FILE), str(out_dir / ONNX_INT8_FILE), weight_type=QuantType.QInt8)
+        model_file = ONNX_INT8_FILE
+
+    hf_tokenizer.backend_tokenizer.save(str(out_dir / TOKENIZER_FILE))
+    with open(out_dir / META_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": model_name,
+            "model_file": model_file,
+            "max_seq_length": model.max_seq_length,
+            "normalize": normalize,
+            "pad_id": hf_tokenizer.pad_token_id or 0,
+            "pad_token": hf_tokenizer.pad_token or "[PAD]",
+        }, f, indent=2)
+
+    if check_texts is None:
+        from rag.ingest import load_corpus
+        check_texts = [c["text"] for c in load_corpus()]
+    worst = check_compatibility(model, OnnxEncoder.load(out_dir, model_name=model_name), check_texts)
+    print(f"Exported {model_name} -> {out_dir / model_file} (min cosine vs torch: {worst:.4f})")
+    return out_dir
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX for the onnx backend.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export")
+    exp.add_argument("--model", default=EMBEDDING_MODEL)
+    exp.add_argument("--out", type=Path, default=None, help="default: index_store/onnx/<model>")
+    exp.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        export_onnx(args.model, args.out, quantize=not args.no_quantize)
+
+
+if __name__ == "__main__":
+    main()
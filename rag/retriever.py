@@ -1,25 +1,32 @@
 """Hybrid retriever: BM25 + dense (Chroma), RRF fusion, optional re-ranking."""
-import json
 import pickle
 from pathlib import Path
+from typing import Callable
 
 from rank_bm25 import BM25Okapi
 
 import sys
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from config import (
-    CHUNKS_JSON_PATH,
     BM25_INDEX_PATH,
     CHROMA_PERSIST_DIR,
-    EMBEDDING_MODEL,
+    CHUNK_TEXTS_PATH,
+    CHUNK_META_PATH,
     TOP_K_SPARSE,
     TOP_K_DENSE,
     TOP_K_FUSION,
     TOP_K_FINAL,
+    RRF_K,
+    DENSE_INDEX,
+    EMBEDDINGS_NPY_PATH,
+    EMBED_BATCHING,
+    TORCH_NUM_THREADS,
 )
+from rag.chunk_store import ChunkStore
+from rag.bm25_tokenizers import tokenize_for_bm25
 
 
-def _rrf(rank_lists: list[list[str]], k: int = 60) -> list[str]:
+def _rrf(rank_lists: list[list[str]], k: int = RRF_K) -> list[str]:
     """Reciprocal Rank Fusion. rank_lists = [ids_from_bm25, ids_from_chroma]."""
     scores: dict[str, float] = {}
     for rank_list in rank_lists:
@@ -32,9 +39,12 @@ def _rrf(rank_lists: list[list[str]], k: int = 60) -> list[str]:
 class Retriever:
     """Hybrid BM25 + dense retriever with RRF and optional re-ranking."""
 
+    # Set on retrievers built from a versioned snapshot (rag/snapshots.py)
+    snapshot_id: str = ""
+
     def __init__(
         self,
-        chunks: list[dict],
+        chunks: "list[dict] | ChunkStore",
         bm25: BM25Okapi,
         chroma_collection,
         embedding_model,
@@ -42,27 +52,25 @@ class Retriever:
         top_k_dense: int = TOP_K_DENSE,
         top_k_fusion: int = TOP_K_FUSION,
         top_k_final: int = TOP_K_FINAL,
+        rrf_k: int = RRF_K,
+        tokenizer: Callable[[str], list[str]] = tokenize_for_bm25,
     ):
-        self.chunks = {c["chunk_id"]: c for c in chunks}
+        # Metadata + offsets only; texts stay in the (memory-mapped) blob until a chunk is returned.
+        # No token lists are kept here: BM25 already holds its own term statistics.
+        self.store = chunks if isinstance(chunks, ChunkStore) else ChunkStore.from_chunks(chunks)
         self.bm25 = bm25
         self.chroma_collection = chroma_collection
         self.embedding_model = embedding_model
-        self.tokenized_corpus = [
-            [t.lower() for t in c["text"].replace("\n", " ").split() if t.isalnum() or len(t) > 1]
-            for c in chunks
-        ]
-        self.chunk_ids = [c["chunk_id"] for c in chunks]
-        self.tokenized_corpus = [
-            [t.lower() for t in c["text"].replace("\n", " ").split() if t.isalnum() or len(t) > 1]
-            for c in chunks
-        ]
+        self.chunk_ids = self.store.ids
         self.top_k_sparse = top_k_sparse
         self.top_k_dense = top_k_dense
         self.top_k_fusion = top_k_fusion
         self.top_k_final = top_k_final
+        self.rrf_k = rrf_k
+        self.tokenizer = tokenizer
 
     def _bm25_search(self, query: str) -> list[tuple[str, float]]:
-        tokenized_q = [t.lower() for t in query.replace("\n", " ").split() if t.isalnum() or len(t) > 1]
+        tokenized_q = self.tokenizer(query)
         if not tokenized_q:
             return []
         scores = self.bm25.get_scores(tokenized_q)
@@ -93,10 +101,10 @@ class Retriever:
         bm25_hits = self._bm25_search(query)
         bm25_ids = [x[0] for x in bm25_hits]
         dense_ids = self._dense_search(query)
-        fused = _rrf([bm25_ids, dense_ids])[: self.top_k_fusion]
+        fused = _rrf([bm25_ids, dense_ids], k=self.rrf_k)[: self.top_k_fusion]
 
         if template_filter:
-            fused = [cid for cid in fused if self.chunks.get(cid, {}).get("template_ref") == template_filter]
+            fused = [cid for cid in fused if self.store.template_ref(cid) == template_filter]
             if len(fused) > self.top_k_final:
                 fused = fused[: self.top_k_final]
             elif len(fused) < self.top_k_final:
@@ -105,49 +113,67 @@ class Retriever:
                 for c in rest:
                     if len(fused) >= self.top_k_final:
                         break
-                    if self.chunks.get(c, {}).get("template_ref") == template_filter:
+                    if self.store.template_ref(c) == template_filter:
                         fused.append(c)
         else:
             fused = fused[: self.top_k_final]
 
         out = []
         for cid in fused:
-            c = self.chunks.get(cid)
+            c = self.store.get(cid)
             if c:
-                out.append({
-                    "chunk_id": c["chunk_id"],
-                    "source_id": c.get("source_id", ""),
-                    "source_ref": c.get("source_ref", ""),
-                    "source_url": c.get("source_url", ""),
-                    "template_ref": c.get("template_ref"),
-                    "text": c["text"],
-                })
+                out.append(c)
         return out
 
 
-def load_retriever() -> Retriever:
-    """Load chunks, BM25 index, Chroma collection and embedding model; return Retriever."""
-    if not CHUNKS_JSON_PATH.exists():
-        raise FileNotFoundError(f"Run ingest first. Missing {CHUNKS_JSON_PATH}")
-    with open(CHUNKS_JSON_PATH, "r", encoding="utf-8") as f:
-        chunks = json.load(f)
+def load_query_encoder(num_threads: int = TORCH_NUM_THREADS):
+    """EMBEDDING_BACKEND model for query encoding, wrapped in a micro-batching encoder when EMBED_BATCHING is on."""
+    from rag.batching import BatchingEncoder
+    from rag.encoders import load_embedding_model
+    model = load_embedding_model(num_threads=num_threads)
+    return BatchingEncoder(model) if EMBED_BATCHING else model
+
+
+def load_retriever(embedding_model=None, dense_index: str = DENSE_INDEX) -> Retriever:
+    """
+    Load chunks, BM25 index, dense index and embedding model; return Retriever.
+    embedding_model: any object with encode(texts, show_progress_bar=False) (e.g. a remote encoder);
+    loads the EMBEDDING_BACKEND model when None, wrapped in a micro-batching encoder
+    when EMBED_BATCHING is on.
+    dense_index: "chroma" (persistent collection) or "mmap" (read-only embeddings.npy, shared across workers).
+    """
+    if not BM25_INDEX_PATH.exists():
+        raise FileNotFoundError(f"Run ingest first. Missing {BM25_INDEX_PATH}")
     with open(BM25_INDEX_PATH, "rb") as f:
         data = pickle.load(f)
     bm25 = data["bm25"]
-    if data["chunks"] != chunks:
-        chunks = data["chunks"]
-
-    import chromadb
-    from chromadb.config import Settings
-    from sentence_transformers import SentenceTransformer
-
-    client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR, settings=Settings(anonymized_telemetry=False))
-    collection = client.get_collection("corep_rules")
-    model = SentenceTransformer(EMBEDDING_MODEL)
+    if CHUNK_TEXTS_PATH.exists() and CHUNK_META_PATH.exists():
+        store = ChunkStore.open(CHUNK_TEXTS_PATH, CHUNK_META_PATH)
+        if data.get("chunk_ids") is not None and data["chunk_ids"] != store.ids:
+            raise FileNotFoundError(f"BM25 index does not match the chunk store. Re-run ingest ({BM25_INDEX_PATH})")
+    elif "chunks" in data:
+        # Index built before the compact chunk store: BM25 pickle carries the chunk list
+        store = ChunkStore.from_chunks(data["chunks"])
+    else:
+        raise FileNotFoundError(f"Run ingest first. Missing {CHUNK_TEXTS_PATH}")
+
+    if dense_index == "mmap":
+        from rag.dense import NumpyDenseIndex
+        collection = NumpyDenseIndex.load(EMBEDDINGS_NPY_PATH, store.ids)
+    elif dense_index == "chroma":
+        import chromadb
+        from chromadb.config import Settings
+        client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR, settings=Settings(anonymized_telemetry=False))
+        collection = client.get_collection("corep_rules")
+    else:
+        raise ValueError(f"Unknown dense index: {dense_index}")
+
+    if embedding_model is None:
+        embedding_model = load_query_encoder()
 
     return Retriever(
-        chunks=chunks,
+        chunks=store,
         bm25=bm25,
         chroma_collection=collection,
-        embedding_model=model,
+        embedding_model=embedding_model,
     )
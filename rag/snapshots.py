@@ -0,0 +1,324 @@
+"""
+Versioned, content-addressed index snapshots for point-in-time retrieval.
+
+Layout under SNAPSHOT_DIR:
+    objects/chunks/<sha256>.json               one chunk (metadata + text), shared by every snapshot using it
+    objects/embeddings/<model>/<sha256>.npy    embedding of one chunk text, computed once per text and model
+    manifests/<snapshot_id>.json               immutable: effective_from, embedding model, ordered chunk hashes
+    registry.json                              effective_from -> snapshot_id, replaced atomically on publish
+
+The router resolves a reference date to the snapshot effective on that date, keeps a bounded LRU of
+loaded snapshot retrievers, and picks up newly published snapshots without a restart: in-flight
+requests keep the retriever they started with.
+
+Usage:
+    python -m rag.snapshots publish --effective-from 2024-01-01 [--corpus path.json]
+    python -m rag.snapshots list
+"""
+import argparse
+import calendar
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import (
+    SNAPSHOT_DIR,
+    SNAPSHOT_CACHE_SIZE,
+    SNAPSHOT_REFRESH_S,
+    EMBEDDING_MODEL,
+)
+from rag.chunk_store import ChunkStore
+from rag.dense import NumpyDenseIndex, normalize_rows
+from rag.bm25_tokenizers import tokenize_for_bm25
+
+REGISTRY_FILE = "registry.json"
+
+
+def _sha256(data: str) -> str:
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _chunk_hash(chunk: dict) -> str:
+    return _sha256(json.dumps(chunk, sort_keys=True, ensure_ascii=False))
+
+
+def _model_key(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class SnapshotStore:
+    """Reads and writes snapshot objects, manifests and the registry."""
+
+    def __init__(self, root: Path = SNAPSHOT_DIR, model_name: str = EMBEDDING_MODEL):
+        self.root = root
+        self.model_name = model_name
+        self.chunks_dir = root / "objects" / "chunks"
+        self.embeddings_dir = root / "objects" / "embeddings" / _model_key(model_name)
+        self.manifests_dir = root / "manifests"
+        self.registry_path = root / REGISTRY_FILE
+
+    # ---- publish ------------------------------------------------------------------------------
+
+    def publish(self, chunks: list[dict], effective_from: str, embedding_model=None) -> str:
+        """
+        Store a snapshot of `chunks` effective from `effective_from` (YYYY-MM-DD) and register it.
+        Unchanged chunks and their embeddings are reused; only new texts are encoded.
+        Returns the snapshot_id (identical corpora yield the same id).
+        """
+        date.fromisoformat(effective_from)
+        if not chunks:
+            raise ValueError("Corpus is empty")
+        for d in (self.chunks_dir, self.embeddings_dir, self.manifests_dir):
+            d.mkdir(parents=True, exist_ok=True)
+
+        hashes = []
+        for c in chunks:
+            h = _chunk_hash(c)
+            path = self.chunks_dir / f"{h}.json"
+            if not path.exists():
+                _atomic_write(path, json.dumps(c, ensure_ascii=False).encode("utf-8"))
+            hashes.append(h)
+
+        text_hashes = [_sha256(c["text"]) for c in chunks]
+        missing = [i for i, th in enumerate(text_hashes) if not (self.embeddings_dir / f"{th}.npy").exists()]
+        if missing:
+            if embedding_model is None:
+                from rag.encoders import load_embedding_model
+                embedding_model = load_embedding_model("torch", model_name=self.model_name)
+            vectors = normalize_rows(embedding_model.encode([chunks[i]["text"] for i in missing], show_progress_bar=False))
+            for i, vec in zip(missing, vectors):
+                tmp = self.embeddings_dir / f".{text_hashes[i]}.{os.getpid()}.tmp.npy"
+                np.save(tmp, vec)
+                os.replace(tmp, self.embeddings_dir / f"{text_hashes[i]}.npy")
+
+        snapshot_id = _sha256(self.model_name + "\n" + "\n".join(hashes))[:16]
+        manifest_path = self.manifests_dir / f"{snapshot_id}.json"
+        if not manifest_path.exists():
+            _atomic_write(manifest_path, json.dumps({
+                "snapshot_id": snapshot_id,
+                "embedding_model": self.model_name,
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "chunks": hashes,
+            }, indent=2).encode("utf-8"))
+
+        registry = self.read_registry()
+        registry = [e for e in registry if e["effective_from"] != effective_from]
+        registry.append({"effective_from": effective_from, "snapshot_id": snapshot_id})
+        registry.sort(key=lambda e: e["effective_from"])
+        _atomic_write(self.registry_path, json.dumps(registry, indent=2).encode("utf-8"))
+        return snapshot_id
+
+    # ---- read ---------------------------------------------------------------------------------
+
+    def read_registry(self) -> list[dict]:
+        if not self.registry_path.exists():
+            return []
+        with open(self.registry_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def resolve(self, registry: list[dict], reference_date: str | None) -> str | None:
+        """
+        snapshot_id effective on reference_date. Without a date, the snapshot in force today (or the
+        earliest one, if all are future-dated). Raises ValueError for a date before every snapshot.
+        """
+        if not registry:
+            return None
+        on = reference_date or date.today().isoformat()
+        effective = [e for e in registry if e["effective_from"] <= on]
+        if effective:
+            return effective[-1]["snapshot_id"]
+        if reference_date:
+            raise ValueError(
+                f"No index snapshot is effective on {reference_date}; "
+                f"the earliest is effective from {registry[0]['effective_from']}"
+            )
+        return registry[0]["snapshot_id"]
+
+    def load_retriever(self, snapshot_id: str, embedding_model):
+        """Build an in-memory Retriever (chunk store, BM25, dense matrix) for one snapshot."""
+        from rank_bm25 import BM25Okapi
+        from rag.retriever import Retriever
+
+        with open(self.manifests_dir / f"{snapshot_id}.json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        chunks = []
+        for h in manifest["chunks"]:
+            with open(self.chunks_dir / f"{h}.json", "r", encoding="utf-8") as f:
+                chunks.append(json.load(f))
+        store = ChunkStore.from_chunks(chunks)
+        bm25 = BM25Okapi([tokenize_for_bm25(t) for t in store.iter_texts()])
+        embeddings_dir = self.root / "objects" / "embeddings" / _model_key(manifest["embedding_model"])
+        matrix = np.stack([np.load(embeddings_dir / f"{_sha256(c['text'])}.npy") for c in chunks])
+        retriever = Retriever(
+            chunks=store,
+            bm25=bm25,
+            chroma_collection=NumpyDenseIndex(store.ids, matrix),
+            embedding_model=embedding_model,
+        )
+        retriever.snapshot_id = snapshot_id
+        return retriever
+
+
+class SnapshotRouter:
+    """Routes requests to the snapshot effective at their reference date, with an LRU of loaded snapshots."""
+
+    def __init__(
+        self,
+        store: SnapshotStore | None = None,
+        embedding_model=None,
+        max_loaded: int = SNAPSHOT_CACHE_SIZE,
+        refresh_s: float = SNAPSHOT_REFRESH_S,
+    ):
+        self.store = store or SnapshotStore()
+        self._embedding_model = embedding_model
+        self.max_loaded = max_loaded
+        self.refresh_s = refresh_s
+        self._loaded: OrderedDict[str, object] = OrderedDict()
+        self._registry: list[dict] = []
+        self._registry_mtime: float | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._load_locks: dict[str, threading.Lock] = {}
+
+    @property
+    def embedding_model(self):
+        if self._embedding_model is None:
+            from rag.retriever import load_query_encoder
+            self._embedding_model = load_query_encoder()
+        return self._embedding_model
+
+    def set_embedding_model(self, model) -> None:
+        """Use `model` for query encoding in loaded and future snapshot retrievers."""
+        with self._lock:
+            self._embedding_model = model
+            for retriever in self._loaded.values():
+                retriever.embedding_model = model
+
+    def _refresh_registry(self) -> list[dict]:
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_s and self._registry_mtime is not None:
+            return self._registry
+        self._checked_at = now
+        try:
+            mtime = self.store.registry_path.stat().st_mtime
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No snapshots published. Missing {self.store.registry_path}")
+        if mtime != self._registry_mtime:
+            # A new publish: subsequent requests resolve against it; loaded snapshots stay valid (immutable)
+            self._registry = self.store.read_registry()
+            self._registry_mtime = mtime
+        return self._registry
+
+    def snapshot_for(self, reference_date: str | None = None) -> str:
+        """snapshot_id effective at reference_date (YYYY-MM-DD; None = today), without loading it."""
+        with self._lock:
+            return self._resolve(reference_date)
+
+    def _resolve(self, reference_date: str | None) -> str:
+        snapshot_id = self.store.resolve(self._refresh_registry(), reference_date)
+        if snapshot_id is None:
+            raise FileNotFoundError("No snapshots published")
+        return snapshot_id
+
+    def retriever_for(self, reference_date: str | None = None):
+        """Retriever for the snapshot effective at reference_date (YYYY-MM-DD; None = today)."""
+        with self._lock:
+            snapshot_id = self._resolve(reference_date)
+            retriever = self._loaded.get(snapshot_id)
+            if retriever is not None:
+                self._loaded.move_to_end(snapshot_id)
+                return retriever
+            load_lock = self._load_locks.setdefault(snapshot_id, threading.Lock())
+
+        # Load outside the router lock so other snapshots keep serving meanwhile
+        with load_lock:
+            with self._lock:
+                retriever = self._loaded.get(snapshot_id)
+            if retriever is None:
+                retriever = self.store.load_retriever(snapshot_id, self.embedding_model)
+            with self._lock:
+                self._loaded[snapshot_id] = retriever
+                self._loaded.move_to_end(snapshot_id)
+                while len(self._loaded) > self.max_loaded:
+                    evicted, _ = self._loaded.popitem(last=False)
+                    self._load_locks.pop(evicted, None)
+        return retriever
+
+
+_MONTHS = {m.lower(): i for i, m in enumerate(calendar.month_abbr) if m}
+_ISO_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_DMY_RE = re.compile(r"\b(\d{1,2})\s+([A-Za-z]{3,9})\.?\s+(\d{4})\b")
+_QUARTER_RE = re.compile(r"\bQ([1-4])\s*(\d{4})\b", re.IGNORECASE)
+
+
+def parse_reference_date(text: str) -> str | None:
+    """
+    Reference date mentioned in a scenario, as YYYY-MM-DD: ISO dates, "31 Dec 2024" /
+    "31 December 2024", or "Q4 2024" (quarter end). None if no date is found.
+    """
+    if not text:
+        return None
+    m = _ISO_RE.search(text)
+    if m:
+        try:
+            return date(int(m[1]), int(m[2]), int(m[3])).isoformat()
+        except ValueError:
+            pass
+    m = _DMY_RE.search(text)
+    if m and m[2][:3].lower() in _MONTHS:
+        try:
+            return date(int(m[3]), _MONTHS[m[2][:3].lower()], int(m[1])).isoformat()
+        except ValueError:
+            pass
+    m = _QUARTER_RE.search(text)
+    if m:
+        year, month = int(m[2]), int(m[1]) * 3
+        return date(year, month, calendar.monthrange(year, month)[1]).isoformat()
+    return None
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Publish and list versioned index snapshots.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pub = sub.add_parser("publish")
+    pub.add_argument("--effective-from", required=True, help="YYYY-MM-DD")
+    pub.add_argument("--corpus", type=Path, default=None, help="Corpus JSON (default: data/corpus/curated_rules.json)")
+    sub.add_parser("list")
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore()
+    if args.command == "publish":
+        if args.corpus:
+            with open(args.corpus, "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+        else:
+            from rag.ingest import load_corpus
+            chunks = load_corpus()
+        snapshot_id = store.publish(chunks, args.effective_from)
+        print(f"Published snapshot {snapshot_id} effective from {args.effective_from} ({len(chunks)} chunks)")
+    else:
+        for e in store.read_registry():
+            print(f"{e['effective_from']}  {e['snapshot_id']}")
+
+
+if __name__ == "__main__":
+    main()
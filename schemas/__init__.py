@@ -6,6 +6,7 @@ from .corep_ca1 import (
     CA1_FIELD_LABELS,
     CA1_SUM_FIELDS,
     CA1_TOTAL_FIELD,
+    CA1_XBRL_DATAPOINTS,
 )
 
 __all__ = [
@@ -15,4 +16,5 @@ __all__ = [
     "CA1_FIELD_LABELS",
     "CA1_SUM_FIELDS",
     "CA1_TOTAL_FIELD",
+    "CA1_XBRL_DATAPOINTS",
 ]
@@ -41,3 +41,11 @@ CA1_FIELD_LABELS = {
 # Consistency: Total (1.4) should equal 1.1 + 1.2 + 1.3 (for validation)
 CA1_SUM_FIELDS = ["CA1_1_1", "CA1_1_2", "CA1_1_3"]
 CA1_TOTAL_FIELD = "CA1_1_4"
+
+# C 01.00 row/column codes used as datapoint keys in XBRL-CSV table files (column 0010 = Amount)
+CA1_XBRL_DATAPOINTS = {
+    "CA1_1_4": "r0010c0010",  # Own funds
+    "CA1_1_1": "r0020c0010",  # Common Equity Tier 1 capital
+    "CA1_1_2": "r0530c0010",  # Additional Tier 1 capital
+    "CA1_1_3": "r0750c0010",  # Tier 2 capital
+}
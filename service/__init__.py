@@ -1,4 +1,15 @@
 """Pipeline service."""
-from .pipeline import run_pipeline
+from .pipeline import run_pipeline, iter_pipeline, get_retriever, set_retriever, get_router, set_router, index_version
+from .runs import PipelineRun, RunCache
 
-__all__ = ["run_pipeline"]
+__all__ = [
+    "run_pipeline",
+    "iter_pipeline",
+    "get_retriever",
+    "set_retriever",
+    "get_router",
+    "set_router",
+    "index_version",
+    "PipelineRun",
+    "RunCache",
+]
@@ -1,48 +1,151 @@
 """End-to-end pipeline: question + scenario -> template extract, validation, audit log."""
+import logging
+import threading
 from pathlib import Path
+from typing import Iterator
 
 import sys
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from rag.retriever import load_retriever
+from rag.retriever import Retriever, load_retriever
+from rag.snapshots import SnapshotRouter, SnapshotStore, parse_reference_date
 from llm.assistant import build_prompt, call_llm, parse_structured_output
 from template.render import render_template_extract_html
 from template.validation import validate_ca1
 from audit.build import build_audit_log
+from audit.store import AuditRun, get_audit_store
+from config import AUDIT_STORE_ENABLED, BM25_INDEX_PATH
 from schemas.corep_ca1 import CA1_FIELD_LABELS
 
+# One warm retriever per process. The multi-worker server sets it before forking so that
+# workers share the loaded index copy-on-write instead of each calling load_retriever.
+_retriever: Retriever | None = None
+_retriever_lock = threading.Lock()
+# Once snapshots are published, retrieval is routed to the snapshot effective at the reference date
+_router: SnapshotRouter | None = None
 
-def run_pipeline(question: str, scenario: str = "", template_id: str = "C 01.00") -> dict:
+logger = logging.getLogger(__name__)
+
+
+def get_router() -> SnapshotRouter | None:
+    """Return the process-wide snapshot router, or None while no snapshot has been published."""
+    global _router
+    if _router is None:
+        registry_path = SnapshotStore().registry_path
+        if registry_path.exists():
+            with _retriever_lock:
+                if _router is None:
+                    _warn_if_index_newer(registry_path)
+                    # First publish while serving the legacy index: keep its encoder (e.g. the shared
+                    # embedding worker's client) rather than loading another model in this process
+                    _router = SnapshotRouter(embedding_model=_retriever.embedding_model if _retriever else None)
+    return _router
+
+
+def _warn_if_index_newer(registry_path: Path) -> None:
+    # Serving ignores the current index once snapshots exist: an index built without publishing
+    # (e.g. by an older ingest) would otherwise go unnoticed
+    try:
+        if BM25_INDEX_PATH.stat().st_mtime > registry_path.stat().st_mtime:
+            logger.warning(
+                "The index in %s is newer than the latest published snapshot and is not served; "
+                "publish it with `python -m rag.snapshots publish --effective-from YYYY-MM-DD`",
+                BM25_INDEX_PATH.parent,
+            )
+    except FileNotFoundError:
+        pass
+
+
+def set_router(router: SnapshotRouter | None) -> None:
+    """Install (or clear, with None) the process-wide snapshot router."""
+    global _router
+    _router = router
+
+
+def get_retriever(reference_date: str | None = None) -> Retriever:
     """
-    Run RAG -> LLM -> parse -> template render -> validation -> audit log.
-    Returns dict with answer_summary, template_extract_html, validation, audit_log, schema.
+    Return the retriever for reference_date: the effective snapshot if snapshots are published,
+    otherwise the process-wide retriever over the current index, loaded on first use.
+    """
+    global _retriever
+    router = get_router()
+    if router is not None:
+        return router.retriever_for(reference_date)
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = load_retriever()
+    return _retriever
+
+
+def index_version(scenario: str = "") -> str:
+    """
+    Identifies the index a pipeline run for `scenario` would retrieve from: the effective snapshot_id,
+    or the current index's build time while no snapshot is published. Used to key cached results.
     """
-    retriever = load_retriever()
+    router = get_router()
+    if router is not None:
+        return router.snapshot_for(parse_reference_date(scenario))
+    try:
+        return f"index@{BM25_INDEX_PATH.stat().st_mtime_ns}"
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Run ingest first. Missing {BM25_INDEX_PATH}")
+
+
+def set_retriever(retriever: Retriever | None) -> None:
+    """Install (or clear, with None) the process-wide retriever."""
+    global _retriever
+    _retriever = retriever
+
+
+def iter_pipeline(question: str, scenario: str = "", template_id: str = "C 01.00") -> Iterator[tuple[str, dict]]:
+    """
+    Run the pipeline stage by stage, yielding (stage, partial result) as each stage completes:
+    "retrieval" (snapshot_id, retrieved_chunks), "template" (answer_summary, template_extract_html,
+    validation, schema) and "audit" (run_id, audit_log). Used for progressive display.
+    """
+    retriever = get_retriever(parse_reference_date(scenario))
     template_filter = "CA1" if "01" in template_id or "CA1" in template_id else None
     chunks = retriever.retrieve(question=question, scenario=scenario, template_filter=template_filter)
+    yield "retrieval", {"snapshot_id": retriever.snapshot_id, "retrieved_chunks": chunks}
     if not chunks:
-        return {
+        yield "template", {
             "answer_summary": "No relevant regulatory text was found for your question.",
             "template_extract_html": "",
             "validation": {"valid": False, "errors": [{"field_id": "", "message": "No chunks retrieved"}]},
-            "audit_log": {"template_id": template_id, "entries": []},
             "schema": None,
         }
+        yield "audit", {"run_id": None, "audit_log": {"template_id": template_id, "entries": []}}
+        return
+
     system, user = build_prompt(question, scenario, chunks, template_id=template_id)
     raw = call_llm(system, user)
     schema = parse_structured_output(raw)
-    html = render_template_extract_html(schema)
     validation = validate_ca1(schema)
-    chunks_by_id = {c["chunk_id"]: c for c in chunks}
-    audit = build_audit_log(schema, chunks_by_id)
-    return {
+    yield "template", {
         "answer_summary": schema.answer_summary or "",
-        "template_extract_html": html,
+        "template_extract_html": render_template_extract_html(schema),
         "validation": {
             "valid": validation.valid,
             "errors": [{"field_id": i.field_id, "message": i.message} for i in validation.errors()],
             "warnings": [{"field_id": i.field_id, "message": i.message} for i in validation.warnings()],
         },
+        "schema": schema.model_dump(),
+    }
+
+    chunks_by_id = {c["chunk_id"]: c for c in chunks}
+    audit = build_audit_log(schema, chunks_by_id)
+    run_id = None
+    if AUDIT_STORE_ENABLED:
+        # Queued for the background writer; does not wait for disk
+        run_id = get_audit_store().append(
+            AuditRun.from_audit_log(
+                audit, schema.reference_date, question=question, scenario=scenario,
+                snapshot_id=retriever.snapshot_id,
+            )
+        )
+    yield "audit", {
+        "run_id": run_id,
         "audit_log": {
             "template_id": audit.template_id,
             "entries": [
@@ -63,5 +166,18 @@ def run_pipeline(question: str, scenario: str = "", template_id: str = "C 01.00"
                 for e in audit.entries
             ],
         },
-        "schema": schema.model_dump(),
     }
+
+
+def run_pipeline(question: str, scenario: str = "", template_id: str = "C 01.00") -> dict:
+    """
+    Run RAG -> LLM -> parse -> template render -> validation -> audit log.
+    Retrieval uses the index snapshot effective at the reference date found in the scenario (if any).
+    Returns dict with run_id (persisted audit run, if enabled), snapshot_id, answer_summary,
+    template_extract_html, validation, audit_log, schema.
+    """
+    result: dict = {}
+    for _, partial in iter_pipeline(question, scenario, template_id):
+        result.update(partial)
+    del result["retrieved_chunks"]
+    return result
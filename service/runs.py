@@ -0,0 +1,110 @@
+"""Background pipeline runs shared between callers (e.g. Streamlit sessions) with progressive results."""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import UI_PIPELINE_THREADS, UI_RESULT_CACHE_SIZE, UI_RESULT_TTL_S
+from service.pipeline import index_version, iter_pipeline
+
+
+class PipelineRun:
+    """One pipeline run executing off the caller's thread; finished stages can be read while it runs."""
+
+    def __init__(self, question: str, scenario: str, template_id: str, version: str = ""):
+        self.request = (question, scenario, template_id)
+        self.key = (question, scenario, template_id, version)
+        self.stages: list[tuple[str, dict]] = []
+        self.error: BaseException | None = None
+        self.done = False
+        self.finished_at: float | None = None
+        self._cond = threading.Condition()
+
+    def run(self) -> None:
+        try:
+            for stage, partial in iter_pipeline(*self.request):
+                with self._cond:
+                    self.stages.append((stage, partial))
+                    self._cond.notify_all()
+        except BaseException as e:
+            self.error = e
+        finally:
+            with self._cond:
+                self.done = True
+                self.finished_at = time.monotonic()
+                self._cond.notify_all()
+
+    def iter_stages(self, poll_s: float = 0.1) -> Iterator[tuple[str, dict]]:
+        """Yield (stage, partial result) as stages finish, finished ones first; re-raises the run's error."""
+        i = 0
+        while True:
+            with self._cond:
+                if i >= len(self.stages) and not self.done:
+                    # Short waits keep the caller responsive (e.g. to a Streamlit rerun)
+                    self._cond.wait(poll_s)
+                pending = self.stages[i:]
+                done = self.done
+            yield from pending
+            i += len(pending)
+            if done and i >= len(self.stages):
+                if self.error is not None:
+                    raise self.error
+                return
+
+    def result(self) -> dict:
+        """Merged result of all stages (blocks until the run finishes)."""
+        result: dict = {}
+        for _, partial in self.iter_stages():
+            result.update(partial)
+        return result
+
+
+class RunCache:
+    """
+    Bounded map of (question, scenario, template_id, index version) -> PipelineRun shared by all callers
+    in a process. Identical requests join the in-flight run; finished runs are reused until they are
+    `ttl_s` old or a new snapshot / re-ingested index takes effect; failed runs are dropped so the next
+    request retries.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = UI_RESULT_CACHE_SIZE,
+        ttl_s: float = UI_RESULT_TTL_S,
+        threads: int = UI_PIPELINE_THREADS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="pipeline")
+        self._runs: OrderedDict[tuple[str, str, str, str], PipelineRun] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(question: str, scenario: str = "", template_id: str = "C 01.00") -> tuple[str, str, str, str]:
+        """Cache key for a request, including the index version it currently resolves to."""
+        return (question, scenario, template_id, index_version(scenario))
+
+    def get_or_start(self, question: str, scenario: str = "", template_id: str = "C 01.00") -> PipelineRun:
+        key = self.key(question, scenario, template_id)
+        with self._lock:
+            run = self._runs.get(key)
+            if run is not None and (
+                run.error is not None
+                or (run.done and time.monotonic() - run.finished_at > self.ttl_s)
+            ):
+                del self._runs[key]
+                run = None
+            if run is None:
+                run = PipelineRun(*key)
+                self._runs[key] = run
+                self._executor.submit(run.run)
+                while len(self._runs) > self.max_entries:
+                    # An evicted in-flight run still completes for callers already holding it
+                    self._runs.popitem(last=False)
+            else:
+                self._runs.move_to_end(key)
+            return run
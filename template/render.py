@@ -1,37 +1,51 @@
 """Render COREP template extract as HTML."""
+from typing import Iterator
+
 from schemas.corep_ca1 import OwnFundsSchema, CA1_FIELD_LABELS, CA1_REQUIRED_FIELD_IDS
 
+# Precompiled fragments: rendering only fills values, so extracts can be streamed one by one
+_ROW = "<tr><td>{label}</td><td>{value}</td></tr>"
+_HEADER = """<div class="corep-extract">
+  <h3>{template_id} – {template_name}</h3>
+  <p><strong>Reference date:</strong> {reference_date}</p>
+  <table class="corep-table">
+    <thead><tr><th>Row</th><th>Amount</th></tr></thead>
+    <tbody>
+"""
+_FOOTER = """
+    </tbody>
+  </table>
+</div>"""
+
 
 def _field_row(field_id: str, value: str | None, label: str | None = None) -> str:
     lbl = label or CA1_FIELD_LABELS.get(field_id, field_id)
     val = (value or "").strip() or "—"
-    return f"""<tr><td>{lbl}</td><td>{val}</td></tr>"""
+    return _ROW.format(label=lbl, value=val)
 
 
-def render_template_extract_html(schema: OwnFundsSchema) -> str:
-    """
-    Map OwnFundsSchema to a human-readable HTML table (COREP form excerpt).
-    """
+def iter_template_extract_html(schema: OwnFundsSchema) -> Iterator[str]:
+    """Yield the HTML extract piece by piece (header, one row at a time, footer)."""
     field_by_id = {f.field_id: f for f in schema.fields}
-    ref_date = schema.reference_date or "—"
-    rows: list[str] = []
+    yield _HEADER.format(
+        template_id=schema.template_id,
+        template_name=schema.template_name,
+        reference_date=schema.reference_date or "—",
+    )
+    first = True
     for fid in CA1_REQUIRED_FIELD_IDS:
         f = field_by_id.get(fid)
-        value = f.value if f else None
-        rows.append(_field_row(fid, value))
+        yield ("" if first else "\n") + _field_row(fid, f.value if f else None)
+        first = False
     # Any extra fields not in the fixed list
     for f in schema.fields:
         if f.field_id not in CA1_REQUIRED_FIELD_IDS:
-            rows.append(_field_row(f.field_id, f.value))
+            yield "\n" + _field_row(f.field_id, f.value)
+    yield _FOOTER
 
-    table_rows = "\n".join(rows)
-    return f"""<div class="corep-extract">
-  <h3>{schema.template_id} – {schema.template_name}</h3>
-  <p><strong>Reference date:</strong> {ref_date}</p>
-  <table class="corep-table">
-    <thead><tr><th>Row</th><th>Amount</th></tr></thead>
-    <tbody>
-{table_rows}
-    </tbody>
-  </table>
-</div>"""
+
+def render_template_extract_html(schema: OwnFundsSchema) -> str:
+    """
+    Map OwnFundsSchema to a human-readable HTML table (COREP form excerpt).
+    """
+    return "".join(iter_template_extract_html(schema))
@@ -34,7 +34,8 @@ def _field_value_map(schema: OwnFundsSchema) -> dict[str, str | None]:
     return {f.field_id: f.value for f in schema.fields}
 
 
-def _parse_number(s: str | None) -> int | float | None:
+def parse_number(s: str | None) -> int | float | None:
+    """Numeric value of a reported amount ("1,200,000" -> 1200000); None if empty or not a number."""
     if s is None or (isinstance(s, str) and s.strip() == ""):
         return None
     s = str(s).strip().replace(",", "")
@@ -67,7 +68,7 @@ def validate_ca1(schema: OwnFundsSchema) -> ValidationResult:
     for fid in CA1_REQUIRED_FIELD_IDS:
         val = value_by_id.get(fid)
         if val is not None and str(val).strip() != "":
-            if _parse_number(val) is None:
+            if parse_number(val) is None:
                 items.append(ValidationItem(
                     field_id=fid,
                     severity="error",
@@ -75,8 +76,8 @@ def validate_ca1(schema: OwnFundsSchema) -> ValidationResult:
                 ))
 
     # Consistency: Total (1.4) = 1.1 + 1.2 + 1.3
-    sum_vals = [_parse_number(value_by_id.get(fid)) for fid in CA1_SUM_FIELDS]
-    total_val = _parse_number(value_by_id.get(CA1_TOTAL_FIELD))
+    sum_vals = [parse_number(value_by_id.get(fid)) for fid in CA1_SUM_FIELDS]
+    total_val = parse_number(value_by_id.get(CA1_TOTAL_FIELD))
     if all(v is not None for v in sum_vals) and total_val is not None:
         computed = sum(sum_vals)
         if abs(computed - total_val) > 0.01:
@@ -0,0 +1,127 @@
+"""OnnxEncoder pooling/normalisation, export metadata checks and the torch compatibility tolerance."""
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+pytest.importorskip("onnxruntime")
+
+from rag.onnx_encoder import META_FILE, OnnxEncoder, check_compatibility
+
+DIM = 4
+
+
+class FakeTokenizer:
+    """Token ids are word positions + 1; shorter texts are padded to the longest in the batch."""
+
+    def encode_batch(self, texts):
+        lengths = [len(t.split()) for t in texts]
+        width = max(lengths)
+        return [
+            SimpleNamespace(
+                ids=list(range(1, n + 1)) + [0] * (width - n),
+                attention_mask=[1] * n + [0] * (width - n),
+                type_ids=[0] * width,
+            )
+            for n in lengths
+        ]
+
+
+class FakeSession:
+    """Hidden state of token id i is [i, 2i, ...]; padding positions hold large values that pooling must ignore."""
+
+    def __init__(self, input_names=("input_ids", "attention_mask")):
+        self.input_names = input_names
+        self.feeds = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=n) for n in self.input_names]
+
+    def get_outputs(self):
+        return [SimpleNamespace(shape=["batch", "seq", DIM])]
+
+    def run(self, output_names, feeds):
+        self.feeds.append(feeds)
+        ids = feeds["input_ids"].astype(np.float32)
+        hidden = ids[:, :, None] * np.arange(1, DIM + 1, dtype=np.float32)
+        hidden[feeds["attention_mask"] == 0] = 1000.0
+        return [hidden]
+
+
+def _expected_mean(n_tokens: int) -> np.ndarray:
+    return np.mean(np.arange(1, n_tokens + 1)) * np.arange(1, DIM + 1, dtype=np.float32)
+
+
+def test_mean_pooling_ignores_padding():
+    encoder = OnnxEncoder(FakeSession(), FakeTokenizer(), normalize=False)
+    out = encoder.encode(["one", "one two three"])
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out[0], _expected_mean(1), rtol=1e-6)
+    np.testing.assert_allclose(out[1], _expected_mean(3), rtol=1e-6)
+
+
+def test_normalize_returns_unit_vectors():
+    encoder = OnnxEncoder(FakeSession(), FakeTokenizer(), normalize=True)
+    out = encoder.encode(["one", "one two three"])
+    np.testing.assert_allclose(np.linalg.norm(out, axis=1), 1.0, rtol=1e-6)
+    # Same direction as the pooled vectors: padding did not leak in before normalising
+    np.testing.assert_allclose(out[1], _expected_mean(3) / np.linalg.norm(_expected_mean(3)), rtol=1e-6)
+
+
+def test_batches_match_single_pass():
+    texts = ["one", "one two", "one two three", "a b c d e"]
+    whole = OnnxEncoder(FakeSession(), FakeTokenizer(), batch_size=32).encode(texts)
+    split = OnnxEncoder(FakeSession(), FakeTokenizer(), batch_size=1).encode(texts)
+    np.testing.assert_allclose(whole, split, rtol=1e-6)
+
+
+def test_empty_input_and_token_type_ids():
+    assert OnnxEncoder(FakeSession(), FakeTokenizer()).encode([]).shape == (0, DIM)
+    session = FakeSession(("input_ids", "attention_mask", "token_type_ids"))
+    OnnxEncoder(session, FakeTokenizer()).encode(["one two"])
+    assert "token_type_ids" in session.feeds[0]
+    session = FakeSession()
+    OnnxEncoder(session, FakeTokenizer()).encode(["one two"])
+    assert "token_type_ids" not in session.feeds[0]
+
+
+class FixedEncoder:
+    def __init__(self, vectors):
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+
+    def encode(self, texts, show_progress_bar=False):
+        return self.vectors[: len(texts)].copy()
+
+
+def test_check_compatibility_accepts_small_drift():
+    rng = np.random.default_rng(0)
+    ref = rng.normal(size=(8, 16))
+    # int8-like noise: ~1% of the vector norm keeps cosine well above 0.99
+    noisy = ref + rng.normal(scale=0.01 * np.linalg.norm(ref, axis=1, keepdims=True) / 4, size=ref.shape)
+    worst = check_compatibility(FixedEncoder(ref), FixedEncoder(noisy), ["t"] * 8, min_cosine=0.99)
+    assert 0.99 <= worst <= 1.0
+    # Scale does not matter, only direction
+    assert check_compatibility(FixedEncoder(ref), FixedEncoder(ref * 3), ["t"] * 8) == pytest.approx(1.0)
+
+
+def test_check_compatibility_rejects_divergence():
+    ref = np.eye(4)
+    cand = np.eye(4)
+    cand[2] = [0, 0, 1, 1]  # cosine 0.707 for one text
+    with pytest.raises(ValueError, match="min cosine 0.7071"):
+        check_compatibility(FixedEncoder(ref), FixedEncoder(cand), ["t"] * 4, min_cosine=0.99)
+    with pytest.raises(ValueError, match="shape mismatch"):
+        check_compatibility(FixedEncoder(np.eye(4)), FixedEncoder(np.eye(4, 3)), ["t"] * 4)
+
+
+def test_load_rejects_export_of_another_model(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        OnnxEncoder.load(tmp_path, model_name="all-MiniLM-L6-v2")
+    (tmp_path / META_FILE).write_text(json.dumps({"model_name": "other-model", "model_file": "model.onnx"}))
+    with pytest.raises(ValueError, match="other-model"):
+        OnnxEncoder.load(tmp_path, model_name="all-MiniLM-L6-v2")